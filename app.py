@@ -1,142 +1,844 @@
+import time
+launch_time = time.perf_counter()  # Startup is timed from here
+import argparse
 import sys
-import cv2
-import mediapipe as mp
+import os
+import threading
 import math
-from PyQt5.QtCore import Qt, QTimer, QPoint, pyqtSignal
-from PyQt5.QtGui import QFont, QImage, QPixmap, QPainter, QPen, QColor, QBrush
-from PyQt5.QtWidgets import QApplication, QLabel, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QSizePolicy, QPushButton, QGridLayout, QDialog, QComboBox, QFrame, QMessageBox
+import numpy as np
+# OpenCV, MediaPipe and the modules built on them (cameras, pipeline, roi, tracking, stations) are
+# imported where they are first needed, mostly by the HandModelLoader in the background, so the
+# window shows without waiting for them
+from features import draw_landmarks
+from gestures import GestureInterpreter, GestureSink
+from profiling import StageProfiler
+from smoothing import add_pointer_filter_arguments, pointer_filter_from_arguments
+from spatial import SegmentGrid, erase, eraser_radius
+from storage import JournalWriter, export_svg, load_strokes, save_drawing, write_journal
+from strokes import Stroke, StrokeSimplifier, StrokeStore
+from tiles import LOD_PIXELS, MAX_ZOOM_LEVEL, MIN_ZOOM_LEVEL, TileCache, lod_indices, tile_world_rect, visible_tiles, zoom_for
+from engine import AirWritingEngine
+from events import (Clear, ColorChanged, Erased, EraserSelected, EventBus, EventServer, HandDetected, PointerMoved,
+                    StrokeEnded, StrokePoint, StrokeStarted, Undo, parse_address, relay_events)
+from warmup import HandModelLoader
+from PyQt5.QtCore import Qt, QTimer, QPoint, QRect, pyqtSignal
+from PyQt5.QtGui import QFont, QImage, QPixmap, QPainter, QPen, QColor, QBrush, QKeySequence
+from PyQt5.QtWidgets import QApplication, QLabel, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QSizePolicy, QPushButton, QGridLayout, QDialog, QComboBox, QFrame, QMessageBox, QShortcut
 
 class CameraSelectionDialog(QDialog):
-    def __init__(self, parent=None):
+
+    cameras_found = pyqtSignal(object)
+
+    def __init__(self, parent=None, probe_timeout=2.0, max_cameras=8, in_use=None):
         super().__init__(parent)
         self.setWindowTitle("Select Camera")
         
         layout = QVBoxLayout()
         
         self.camera_combobox = QComboBox()
-        self.populate_camera_combobox()
+        self.camera_combobox.addItem("Searching for cameras...")
+        self.camera_combobox.setEnabled(False)
         layout.addWidget(self.camera_combobox)
         
         self.ok_button = QPushButton("OK")
+        self.ok_button.setEnabled(False)
         self.ok_button.clicked.connect(self.accept)
         layout.addWidget(self.ok_button)
         
         self.setLayout(layout)
+
+        # Probe the cameras off the GUI thread; the result is usually cached from startup already
+        self.cameras_found.connect(self.populate_camera_combobox)
+        threading.Thread(target=self.discover, args=(max_cameras, probe_timeout, in_use), name="CameraDiscovery", daemon=True).start()
+
+    def discover(self, max_cameras, probe_timeout, in_use):
+        from cameras import discover_cameras
+        self.cameras_found.emit(discover_cameras(max_cameras, probe_timeout, in_use=in_use))
     
-    def populate_camera_combobox(self):
-        num_cameras = 4  # Assume there are 4 cameras available
-        for i in range(num_cameras):
-            self.camera_combobox.addItem(f"Camera {i}")
+    def populate_camera_combobox(self, cameras):
+        self.camera_combobox.clear()
+        if not cameras:
+            self.camera_combobox.addItem("No camera found")
+            return
+        for camera in cameras:
+            self.camera_combobox.addItem(camera.label(), camera.index)
+        self.camera_combobox.setEnabled(True)
+        self.ok_button.setEnabled(True)
     
     def selected_camera_index(self):
-        return self.camera_combobox.currentIndex()
+        return self.camera_combobox.currentData()
     
 
-class PointWithThickness:
-    def __init__(self, point, thickness, color):
-        self.point = point
-        self.thickness = thickness
-        self.color = color
+class DrawingCanvas(QWidget):
+    background_color = QColor(210, 210, 210)
 
+    session_restored = pyqtSignal(object, object)
 
-class DrawingCanvas(QWidget):
-    def __init__(self, parent=None, main_window=None):
+    def __init__(self, parent=None, main_window=None, tile_cache_bytes=64 * 1024 * 1024):
         super().__init__(parent)
         self.setMinimumSize(400, 400)
-        self.trails = []  # List of trails, each represented by a list of points
-        self.current_trail = []  # Current trail, started but not yet completed
+        self.setFocusPolicy(Qt.WheelFocus)  # Keyboard panning and zooming once clicked
+        self.trails = StrokeStore()  # Finished trails, each stored as a compact Stroke
+        self.index = SegmentGrid()  # Spatial index over the segments of the finished trails
+        self.current_trail = None  # Current trail, started but not yet completed
+        self.simplifier = StrokeSimplifier()  # Drops near-duplicate samples and simplifies finished trails
         self.pointer_position = QPoint(0, 0)
         self.pointer_color = Qt.blue
         self.trail_thickness = 5  # Initial thickness of the trail
+        self.pointer_rect = QRect()  # Area the pointer was last painted in
+
+        # Trails in progress and pointers of the users of a shared wall, keyed by user
+        self.live_trails = {}
+        self.station_pointers = {}  # key -> (position, color, thickness)
+        self.station_pointer_rects = {}
+        self.live_committed = set()  # Ids of the trails other users finished, left alone by undo_last_trail
+
+        # Infinite canvas: trails are stored in world coordinates and shown through a view at one of
+        # the zoom levels of tiles.zoom_for. view_x/view_y is the top left corner of the widget in
+        # the pixels of the current zoom level, kept integral so tiles line up with the screen.
+        self.zoom_level = 0
+        self.view_x = 0
+        self.view_y = 0
+        self.tiles = TileCache(tile_cache_bytes)  # Finished trails rendered per zoom level
+        self.drag_position = None  # Last mouse position while panning with the mouse
+
+        # Offscreen backing store: committed trails are rasterized once into committed_layer,
+        # the trail being drawn is rasterized segment by segment into current_layer
+        self.committed_layer = None
+        self.current_layer = None
+        self.undo_layer = None  # committed_layer as it was before the last trail was added
+        self.committed_layer_valid = False
+        self.snapshot_image = None  # Reused by snapshot() for the session recording
+
+        # Timing of paint events, shared with the main window when profiling is enabled
+        self.profiler = StageProfiler()
+        self.pending_capture_time = None  # Capture time of the newest frame not painted yet
+
+        # Autosave journal receiving finished trails, undos, erasures and clears, if enabled
+        self.journal = None
+        self.restoring = False  # True while open_session loads the previous session; input waits for it
         
-        # Set the main window reference
+        # Main window whose pointer signals drive the pointer; optional, the wall and the replay
+        # harness position pointers themselves
         self.main_window = main_window
 
         # Connection
         if self.main_window:
             self.main_window.pointer_position_changed.connect(self.update_pointer_position)
             self.main_window.pointer_color_and_thickness_changed.connect(self.update_pointer_color_and_thickness)
-        else:
-            print("Error: MainWindow reference not provided.")
         
         # Ensure that the pointer widget stays on top
         self.setWindowFlags(Qt.WindowStaysOnTopHint)
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.fillRect(self.rect(), QColor(210, 210, 210))  # Set the white background
-        
-        # Draw trails with variable thicknesses
-        for trail in self.trails:
-            for i in range(1, len(trail)):
-                pen = QPen(trail[i].color)  # Use the color of the current trail
-                pen.setWidth(int(trail[i].thickness))  # Set the thickness of the trail
-                painter.setPen(pen)
-                # Extract points and pass them to the drawLine method
-                p1 = trail[i - 1].point
-                p2 = trail[i].point
-                painter.drawLine(p1, p2)
-
-        # Draw the current trail
-        for i in range(1, len(self.current_trail)):
-            pen = QPen(self.current_trail[i].color)  # Use the color of the current trail
-            pen.setWidth(int(self.current_trail[i].thickness))  # Set the thickness of the trail
-            painter.setPen(pen)
-            # Extract points and pass them to the drawLine method
-            p1 = self.current_trail[i - 1].point
-            p2 = self.current_trail[i].point
-            painter.drawLine(p1, p2)
+    @property
+    def zoom(self):
+        return zoom_for(self.zoom_level)
+
+    def apply_view(self, painter, left=0, top=0):
+        # Map world coordinates to the pixels of a layer whose top left corner is at (left, top)
+        # on the widget; nothing to do at the default view
+        if self.zoom_level == 0 and self.view_x + left == 0 and self.view_y + top == 0:
+            return
+        painter.translate(-self.view_x - left, -self.view_y - top)
+        painter.scale(self.zoom, self.zoom)
+
+    def to_world(self, point):
+        zoom = self.zoom
+        return round((point.x() + self.view_x) / zoom), round((point.y() + self.view_y) / zoom)
+
+    def to_screen_rect(self, x0, y0, x1, y1):
+        zoom = self.zoom
+        return QRect(QPoint(math.floor(x0 * zoom) - self.view_x, math.floor(y0 * zoom) - self.view_y),
+                     QPoint(math.ceil(x1 * zoom) - self.view_x, math.ceil(y1 * zoom) - self.view_y))
+
+    def to_world_rect(self, rect):
+        zoom = self.zoom
+        return ((rect.left() + self.view_x) / zoom, (rect.top() + self.view_y) / zoom,
+                (rect.right() + 1 + self.view_x) / zoom, (rect.bottom() + 1 + self.view_y) / zoom)
 
-        # Draw the pointer
-        pointer_size = math.sqrt(self.trail_thickness)  # Pointer size
+    def paintEvent(self, event):
+        with self.profiler.stage("canvas_paint"):
+            self.ensure_layers()
+
+            # Only the dirty area is repainted; Qt clips the painter to it
+            rect = event.rect()
+            painter = QPainter(self)
+            # The committed layer already contains the background and every finished trail
+            painter.drawPixmap(rect, self.committed_layer, rect)
+            painter.drawPixmap(rect, self.current_layer, rect)
+
+            # Draw the pointer; its outline shrinks a little with every paint
+            pointer_size = math.sqrt(self.trail_thickness)  # Pointer size
+            if self.trail_thickness > 2:
+                self.trail_thickness -= 2
+            self.draw_pointers(painter, pointer_size, self.trail_thickness)
+            painter.end()
+
+        if self.pending_capture_time is not None:
+            self.profiler.record_latency(self.pending_capture_time)
+            self.pending_capture_time = None
+
+    def draw_pointers(self, painter, pointer_size, outline_width):
         pen = QPen(self.pointer_color)  # Set the outline color of the pointer
-        if self.trail_thickness > 2:
-            self.trail_thickness -= 2
-        pen.setWidth(self.trail_thickness)  # Set the outline width
+        pen.setWidth(outline_width)  # Set the outline width
         brush = QBrush(self.pointer_color)  # Set the fill color of the pointer
         painter.setPen(pen)
         painter.setBrush(brush)
         painter.drawEllipse(self.pointer_position, pointer_size, pointer_size)
 
-    def draw_trail(self, painter, trail):
-        for i in range(1, len(trail)):
-            pen = QPen(trail[i].color)
-            pen.setWidth(trail[i].thickness)
+        for position, color, thickness in self.station_pointers.values():
+            pen = QPen(color)
+            pen.setWidth(thickness)
             painter.setPen(pen)
-            painter.drawLine(trail[i - 1].point, trail[i].point)
+            painter.setBrush(QBrush(color))
+            painter.drawEllipse(position, math.sqrt(thickness), math.sqrt(thickness))
+
+    def snapshot(self):
+        # The canvas as shown, pointer included, composed from the layers into a reused RGB32 image.
+        # Unlike grab() this is no paint event, so the pointer animation and the latency
+        # measurement are left alone.
+        self.ensure_layers()
+        if self.snapshot_image is None or self.snapshot_image.size() != self.size():
+            self.snapshot_image = QImage(self.size(), QImage.Format_RGB32)
+        painter = QPainter(self.snapshot_image)
+        painter.drawPixmap(0, 0, self.committed_layer)
+        painter.drawPixmap(0, 0, self.current_layer)
+        self.draw_pointers(painter, math.sqrt(self.trail_thickness), self.trail_thickness)
+        painter.end()
+        return self.snapshot_image
+
+    def resizeEvent(self, event):
+        # Layers are sized to the widget, rebuild them lazily at the new size
+        self.committed_layer = None
+        self.current_layer = None
+        self.undo_layer = None
+        self.committed_layer_valid = False
+        super().resizeEvent(event)
+
+    def ensure_layers(self):
+        if self.committed_layer is None:
+            self.committed_layer = QPixmap(self.size())
+            self.committed_layer_valid = False
+        if not self.committed_layer_valid:
+            self.rebuild_committed_layer()
+        if self.current_layer is None:
+            self.current_layer = QPixmap(self.size())
+            self.redraw_current_layer()
+
+    def redraw_current_layer(self):
+        # current_layer holds every trail in progress: the local one and those of the wall users
+        self.current_layer.fill(Qt.transparent)
+        painter = QPainter(self.current_layer)
+        self.apply_view(painter)
+        if self.current_trail is not None:
+            self.draw_trail(painter, self.current_trail)
+        for trail in self.live_trails.values():
+            self.draw_trail(painter, trail)
+        painter.end()
+
+    def rebuild_committed_layer(self):
+        # Compose the view from tiles, rendering only the ones not cached yet. Needed after a resize,
+        # a pan or zoom, or several undos in a row.
+        with self.profiler.stage("compose_tiles"):
+            self.committed_layer.fill(self.background_color)
+            painter = QPainter(self.committed_layer)
+            size = self.tiles.tile_size
+            for column, row in visible_tiles(self.view_x, self.view_y, self.width(), self.height(), size):
+                painter.drawPixmap(column * size - self.view_x, row * size - self.view_y, self.tile(column, row))
+            painter.end()
+        self.committed_layer_valid = True
+        self.undo_layer = None
+
+    def tile(self, column, row):
+        key = (self.zoom_level, column, row)
+        tile = self.tiles.get(key)
+        if tile is not None:
+            return tile
+        size = self.tiles.tile_size
+        tile = QPixmap(size, size)
+        tile.fill(self.background_color)
+        x0, y0, x1, y1 = tile_world_rect(key, size)
+        stroke_ids = self.index.strokes_in_rect(x0, y0, x1, y1)
+        if stroke_ids:
+            painter = QPainter(tile)
+            if self.zoom_level or column or row:
+                painter.translate(-column * size, -row * size)
+                painter.scale(self.zoom, self.zoom)
+            # Zoomed out, points that land on the same few screen pixels are merged
+            lod_cell = LOD_PIXELS / self.zoom if self.zoom < 1 else None
+            for stroke_id in self.trails.drawing_order(stroke_ids):
+                self.draw_trail(painter, self.trails.get(stroke_id), lod_cell=lod_cell)
+            painter.end()
+        self.tiles.put(key, tile)
+        return tile
+
+    def trails_changed(self, bounds):
+        # Cached tiles showing the world rectangle bounds are out of date
+        if bounds is not None:
+            self.tiles.invalidate(*bounds)
+
+    def repaint_committed_region(self, rect):
+        # Redraw the committed layer inside rect from the trails the spatial index finds there
+        if not self.committed_layer_valid:
+            return
+        rect = rect.intersected(self.committed_layer.rect())
+        if rect.isEmpty():
+            return
+        stroke_ids = self.trails.drawing_order(self.index.strokes_in_rect(*self.to_world_rect(rect)))
+        # The raster engine rounds clipped lines differently, so the trails are drawn whole into a
+        # patch that contains them and only rect is copied back
+        area = rect
+        for stroke_id in stroke_ids:
+            area = area.united(self.trail_rect(self.trails.get(stroke_id)))
+        area = area.intersected(self.committed_layer.rect())  # Clipped at the same edges as a rebuild
+        patch = QPixmap(area.size())
+        patch.fill(self.background_color)
+        painter = QPainter(patch)
+        painter.translate(-area.left(), -area.top())
+        self.apply_view(painter)
+        for stroke_id in stroke_ids:
+            self.draw_trail(painter, self.trails.get(stroke_id))
+        painter.end()
+        painter = QPainter(self.committed_layer)
+        painter.drawPixmap(rect, patch, rect.translated(-area.left(), -area.top()))
+        painter.end()
+
+    @staticmethod
+    def draw_trail(painter, trail, first_segment=1, lod_cell=None):
+        # Draw trails with variable thicknesses straight from the stroke arrays, reusing one pen per
+        # trail and only touching the painter state when the width changes. Measured against
+        # drawLines/QPainterPath batches this is faster for wide pens on the raster engine,
+        # which strokes a batch as one combined outline.
+        xs, ys, thicknesses = trail.xs, trail.ys, trail.thicknesses
+        pen = QPen(QColor.fromRgba(trail.color))  # Use the color of the trail
+        pen_width = None
+        if lod_cell is not None and len(xs) > 2:
+            # Level of detail: only the points lod_indices keeps, each segment with the width of its end
+            points = lod_indices(xs, ys, lod_cell).tolist()
+            for previous, i in zip(points, points[1:]):
+                width = int(thicknesses[i])
+                if width != pen_width:
+                    pen.setWidth(width)
+                    painter.setPen(pen)
+                    pen_width = width
+                painter.drawLine(xs[previous], ys[previous], xs[i], ys[i])
+            return
+        for i in range(first_segment, len(xs)):
+            width = int(thicknesses[i])
+            if width != pen_width:
+                pen.setWidth(width)  # Set the thickness of the trail
+                painter.setPen(pen)
+                pen_width = width
+            painter.drawLine(xs[i - 1], ys[i - 1], xs[i], ys[i])
+
+    def trail_rect(self, trail, first_point=0):
+        # Widget area covered by the trail from first_point on, including the square pen caps
+        xs, ys = trail.xs[first_point:], trail.ys[first_point:]
+        margin = int(max(trail.thicknesses[first_point:])) + 2
+        rect = self.to_screen_rect(min(xs), min(ys), max(xs), max(ys))
+        return rect.adjusted(-margin, -margin, margin, margin)
+
+    def draw_last_segment(self):
+        # Rasterize only the newest segment of the current trail
+        if self.current_layer is None or len(self.current_trail) < 2:
+            return
+        painter = QPainter(self.current_layer)
+        self.apply_view(painter)
+        self.draw_trail(painter, self.current_trail, len(self.current_trail) - 1)
+        painter.end()
 
     def add_point(self, point, thickness, color):
         # Add the point to the current trail with the specified thickness and color
-        self.current_trail.append(PointWithThickness(point, thickness, color))
-        self.update()
+        if self.current_trail is None:
+            self.current_trail = Stroke(QColor(color).rgba())
+        x, y = self.to_world(point)
+        if not self.simplifier.accept(self.current_trail, x, y):
+            return  # Too close to the previous point to change the drawing
+        self.current_trail.append(x, y, thickness)
+        self.draw_last_segment()
+        self.update(self.trail_rect(self.current_trail, max(0, len(self.current_trail) - 2)))
 
     def start_new_line(self, point, thickness, color):
         # Create a new trail with the provided point, thickness, and color
-        self.current_trail = [PointWithThickness(point, thickness, color)]
-        self.update()
+        abandoned = self.current_trail is not None and len(self.current_trail) > 1
+        self.current_trail = Stroke(QColor(color).rgba())
+        x, y = self.to_world(point)
+        self.simplifier.accept(self.current_trail, x, y)
+        self.current_trail.append(x, y, thickness)
+        if self.current_layer is not None:
+            self.redraw_current_layer()  # Drops an abandoned trail, keeps the other users' ones
+        if abandoned:
+            self.update()  # A trail that was never closed disappears
+        else:
+            self.update(self.trail_rect(self.current_trail))
 
     def close_line(self):
-        if len(self.current_trail) >= 2:
-            self.trails.append(self.current_trail)
-        self.current_trail = []  # Clear the current trail
+        if self.current_trail is not None and len(self.current_trail) >= 2:
+            trail = self.simplifier.finish(self.current_trail)
+            self.index.add_stroke(self.trails.append(trail), trail)
+            self.trails_changed(trail.bounds())
+            if self.journal is not None:
+                self.journal.stroke(trail)
+            if self.committed_layer_valid and self.current_layer is not None:
+                # Keep the previous state around so a single undo is just a swap,
+                # then merge the trail into the committed layer
+                self.undo_layer = QPixmap(self.committed_layer)
+                painter = QPainter(self.committed_layer)
+                if trail is self.current_trail and not self.live_trails:
+                    painter.drawPixmap(0, 0, self.current_layer)  # Already rasterized, and alone there
+                else:
+                    # Draw the simplified trail so the layer matches what a rebuild would produce
+                    self.apply_view(painter)
+                    self.draw_trail(painter, trail)
+                    self.update(self.trail_rect(self.current_trail))
+                painter.end()
+            else:
+                self.committed_layer_valid = False
+                self.update()
+        self.current_trail = None  # Clear the current trail
+        if self.current_layer is not None:
+            if self.live_trails:
+                self.redraw_current_layer()
+            else:
+                self.current_layer.fill(Qt.transparent)
+
+    def undo_last_trail(self):
+        # Remove the last trail drawn here (not by another user), or the pieces the eraser left of it
+        drawn = list(self.trails.drawn())
+        origin = next((origin for origin in reversed(drawn) if origin not in self.live_committed), None)
+        if origin is None:
+            return
+        rect = QRect()
+        removed = self.trails.pop(origin)
+        for stroke_id, trail in removed:
+            self.index.remove_stroke(stroke_id)
+            self.trails_changed(trail.bounds())
+            rect = rect.united(self.trail_rect(trail))
+        if self.journal is not None:
+            if origin == drawn[-1]:
+                self.journal.undo()
+            else:
+                # An undo record would take the newest trail, another user's
+                for stroke_id, _ in removed:
+                    self.journal.remove(stroke_id)
+        if self.undo_layer is not None:
+            self.committed_layer = self.undo_layer
+            self.undo_layer = None
+        else:
+            self.repaint_committed_region(rect)
+        self.update(rect)
+
+    def erase_at(self, point, radius):
+        # Remove the parts of finished trails within radius of point, splitting trails as needed
+        x, y = self.to_world(point)
+        radius = radius / self.zoom  # The eraser keeps its size on screen
+        dirty = erase(self.trails, self.index, x, y, radius)
+        if dirty is None:
+            return
+        self.trails_changed(dirty)
+        if self.journal is not None:
+            self.journal.erase(x, y, radius)
+        rect = self.to_screen_rect(*dirty)
+        self.undo_layer = None  # The layer before the last trail no longer matches the trails
+        self.repaint_committed_region(rect)
+        self.update(rect)
+
+    def clear_own_trails(self):
+        # Clear what was drawn here, keeping the trails of other users (--connect)
+        if not self.live_committed:
+            self.clear()
+            return
+        for stroke_id in [stroke_id for stroke_id in self.trails.strokes
+                          if self.trails.origin(stroke_id) not in self.live_committed]:
+            self.trails.remove(stroke_id)
+            self.index.remove_stroke(stroke_id)
+            if self.journal is not None:
+                self.journal.remove(stroke_id)  # A clear record would take the other users' trails too
+        self.tiles.clear()
+        self.current_trail = None
+        if self.current_layer is not None:
+            self.redraw_current_layer()
+        self.committed_layer_valid = False
+        self.undo_layer = None
+        self.update()
+
+    def clear(self):
+        if self.journal is not None and self.trails:
+            self.journal.clear()
+        self.trails.clear()  # Clear the list of trails
+        self.index.clear()
+        self.tiles.clear()
+        self.current_trail = None  # Also clear the current trail
+        self.live_trails = {}
+        self.live_committed = set()
+        if self.committed_layer is not None:
+            self.committed_layer.fill(self.background_color)
+            self.committed_layer_valid = True
+        if self.current_layer is not None:
+            self.current_layer.fill(Qt.transparent)
+        self.undo_layer = None
+        self.update()
+
+    def add_live_point(self, key, point, thickness, color, new_line=False):
+        # Add a point to the trail in progress of a wall user, starting a new trail if asked to
+        trail = self.live_trails.get(key)
+        if trail is None or new_line:
+            trail = self.live_trails[key] = Stroke(QColor(color).rgba())
+        x, y = self.to_world(point)
+        if not self.simplifier.accept(trail, x, y):
+            return
+        trail.append(x, y, thickness)
+        if self.current_layer is not None and len(trail) >= 2:
+            painter = QPainter(self.current_layer)
+            self.apply_view(painter)
+            self.draw_trail(painter, trail, len(trail) - 1)
+            painter.end()
+        self.update(self.trail_rect(trail, max(0, len(trail) - 2)))
+
+    def commit_live_trail(self, key):
+        # Finish the trail in progress of a wall user; returns its stroke id, or None if nothing was kept
+        trail = self.live_trails.pop(key, None)
+        if trail is None:
+            return None
+        stroke_id = None
+        if len(trail) >= 2:
+            finished = self.simplifier.finish(trail)
+            stroke_id = self.trails.append(finished)
+            self.live_committed.add(stroke_id)
+            self.index.add_stroke(stroke_id, finished)
+            self.trails_changed(finished.bounds())
+            if self.journal is not None:
+                self.journal.stroke(finished)
+            if self.committed_layer_valid:
+                painter = QPainter(self.committed_layer)
+                self.apply_view(painter)
+                self.draw_trail(painter, finished)
+                painter.end()
+            self.undo_layer = None  # Wall users undo by stroke id, not by swapping layers
+        if self.current_layer is not None:
+            self.redraw_current_layer()
+        self.update(self.trail_rect(trail))
+        return stroke_id
+
+    def remove_trail(self, stroke_id):
+        # Remove one finished trail, e.g. undone by the wall user who drew it. Returns False if it
+        # is already gone (cleared, or split by the eraser).
+        if stroke_id not in self.trails:
+            return False
+        trail = self.trails.remove(stroke_id)
+        self.live_committed.discard(stroke_id)
+        self.index.remove_stroke(stroke_id)
+        self.trails_changed(trail.bounds())
+        if self.journal is not None:
+            self.journal.remove(stroke_id)
+        self.undo_layer = None
+        rect = self.trail_rect(trail)
+        self.repaint_committed_region(rect)
+        self.update(rect)
+        return True
+
+    def set_station_pointer(self, key, position, color, thickness):
+        thickness = max(1, int(thickness))
+        self.station_pointers[key] = (position, color, thickness)
+        extent = int(math.sqrt(thickness) + thickness) + 2
+        rect = QRect(position.x() - extent, position.y() - extent, 2 * extent, 2 * extent)
+        self.update(self.station_pointer_rects.get(key, QRect()).united(rect))
+        self.station_pointer_rects[key] = rect
+
+    def load_strokes(self, strokes):
+        # Replace the drawing with the given finished trails
+        self.clear()
+        for trail in strokes:
+            self.index.add_stroke(self.trails.append(trail), trail)
+        self.committed_layer_valid = False
+        self.update()
+
+    def finish_restore(self, strokes, journal_path):
+        # The previous session has been loaded (and its journal compacted) in the background
+        if strokes:
+            self.load_strokes(strokes)
+        if journal_path is not None:
+            self.journal = JournalWriter(journal_path)
+        self.restoring = False
+
+    def set_view(self, zoom_level, view_x, view_y):
+        # Show another part of the canvas; cached tiles make this a blit of the visible tiles
+        self.zoom_level = max(MIN_ZOOM_LEVEL, min(MAX_ZOOM_LEVEL, zoom_level))
+        self.view_x = int(view_x)
+        self.view_y = int(view_y)
+        self.committed_layer_valid = False
+        self.undo_layer = None
+        if self.current_layer is not None:
+            self.redraw_current_layer()
+        self.update()
+
+    def pan(self, dx, dy):
+        # Move the view by (dx, dy) widget pixels
+        self.set_view(self.zoom_level, self.view_x + dx, self.view_y + dy)
+
+    def zoom_at(self, point, steps):
+        # Zoom in (steps > 0) or out by whole zoom levels, keeping the world point under point fixed
+        level = max(MIN_ZOOM_LEVEL, min(MAX_ZOOM_LEVEL, self.zoom_level + steps))
+        if level == self.zoom_level:
+            return
+        world_x = (point.x() + self.view_x) / self.zoom
+        world_y = (point.y() + self.view_y) / self.zoom
+        zoom = zoom_for(level)
+        self.set_view(level, round(world_x * zoom - point.x()), round(world_y * zoom - point.y()))
+
+    def reset_view(self):
+        self.set_view(0, 0, 0)
+
+    def wheelEvent(self, event):
+        steps = event.angleDelta().y() // 120
+        if steps:
+            self.zoom_at(event.pos(), steps)
+
+    def mousePressEvent(self, event):
+        self.drag_position = event.pos()
+
+    def mouseMoveEvent(self, event):
+        if self.drag_position is not None:
+            delta = self.drag_position - event.pos()
+            self.drag_position = event.pos()
+            self.pan(delta.x(), delta.y())
+
+    def mouseReleaseEvent(self, event):
+        self.drag_position = None
+
+    def keyPressEvent(self, event):
+        step = 64
+        key = event.key()
+        if key == Qt.Key_Left:
+            self.pan(-step, 0)
+        elif key == Qt.Key_Right:
+            self.pan(step, 0)
+        elif key == Qt.Key_Up:
+            self.pan(0, -step)
+        elif key == Qt.Key_Down:
+            self.pan(0, step)
+        elif key in (Qt.Key_Plus, Qt.Key_Equal):
+            self.zoom_at(self.rect().center(), 1)
+        elif key == Qt.Key_Minus:
+            self.zoom_at(self.rect().center(), -1)
+        elif key in (Qt.Key_0, Qt.Key_Home):
+            self.reset_view()
+        else:
+            super().keyPressEvent(event)
+
+    def update_pointer(self):
+        # Repaint where the pointer was and where it is now
+        extent = int(math.sqrt(self.trail_thickness) + self.trail_thickness) + 2
+        rect = QRect(self.pointer_position.x() - extent, self.pointer_position.y() - extent, 2 * extent, 2 * extent)
+        self.update(self.pointer_rect.united(rect))
+        self.pointer_rect = rect
 
     def update_pointer_position(self, position):
         self.pointer_position = position
-        self.update()
+        self.update_pointer()
 
     def update_pointer_color_and_thickness(self, color, thickness):
         self.pointer_color = color
         self.trail_thickness = thickness  # Use the trail thickness as the outline width
-        self.update()
+        self.update_pointer()
+
+
+class CanvasEventConsumer:
+    # Applies the events of the local AirWritingEngine to the main window
+    tool_colors = {"blue": Qt.blue, "red": Qt.red, "green": Qt.green}
+
+    def __init__(self, main_window):
+        self.main_window = main_window
+        self.detections = []  # (hand_index, BGR color, thickness) of the hands to draw on the video
+        self.stroke_color = Qt.blue  # Color of the stroke in progress
+
+    def apply(self, events):
+        window = self.main_window
+        canvas = window.drawing_canvas
+        for event in events:
+            event_type = type(event)
+            if event_type is StrokePoint:
+                canvas.add_point(QPoint(event.x, event.y), event.thickness, self.stroke_color)
+            elif event_type is PointerMoved:
+                # Update the pointer with the average position and color
+                window.pointer_position_changed.emit(QPoint(event.x, event.y))
+                color = self.tool_colors.get(event.color, window.current_color)
+                window.pointer_color_and_thickness_changed.emit(QColor(color), int(event.thickness))
+            elif event_type is HandDetected:
+                # Draw detection with the selected color while writing, white otherwise. Drawing
+                # happens later, on the downscaled display image.
+                color = window.hands_color if event.writing else (255, 255, 255)
+                self.detections.append((event.hand, color, int(event.thickness)))
+            elif event_type is StrokeStarted:
+                self.stroke_color = self.tool_colors[event.color]
+                canvas.start_new_line(QPoint(event.x, event.y), event.thickness, self.stroke_color)
+            elif event_type is StrokeEnded:
+                canvas.close_line()
+            elif event_type is Erased:
+                canvas.erase_at(QPoint(event.x, event.y), event.radius)
+            elif event_type is ColorChanged:
+                window.select_color(self.tool_colors[event.color])
+            elif event_type is EraserSelected:
+                window.select_eraser()
+            elif event_type is Undo:
+                window.undo_last_stroke()
+            elif event_type is Clear:
+                window.clear_canvas()
+
+
+class RemoteEventConsumer:
+    # Applies the events of a remote engine (--connect) to the canvas next to the local user, like
+    # one more user of the shared wall: its strokes are live trails of their own, keyed by stroke
+    # id, its pointer is drawn separately, and its undo and clear only touch its own strokes.
+    # Hand detections refer to the remote camera and are ignored.
+    tool_colors = CanvasEventConsumer.tool_colors
+
+    def __init__(self, canvas, source):
+        self.canvas = canvas
+        self.source = source  # Key of the remote on the canvas, e.g. its address
+        self.stroke_colors = {}  # Stroke id -> QColor of the remote strokes in progress
+        self.history = []  # Canvas stroke ids of the finished remote strokes, oldest first
+
+    def apply(self, events):
+        canvas = self.canvas
+        for event in events:
+            event_type = type(event)
+            if event_type is StrokePoint:
+                color = self.stroke_colors.get(event.stroke)
+                if color is not None:  # Strokes started before the connection are skipped
+                    canvas.add_live_point((self.source, event.stroke), QPoint(event.x, event.y), event.thickness, color)
+            elif event_type is PointerMoved:
+                color = QColor(self.tool_colors.get(event.color, Qt.white))  # White while erasing
+                canvas.set_station_pointer(self.source, QPoint(event.x, event.y), color, event.thickness)
+            elif event_type is StrokeStarted:
+                color = self.stroke_colors[event.stroke] = QColor(self.tool_colors[event.color])
+                canvas.add_live_point((self.source, event.stroke), QPoint(event.x, event.y), event.thickness, color,
+                                      new_line=True)
+            elif event_type is StrokeEnded:
+                self.end_stroke(event.stroke)
+            elif event_type is Erased:
+                canvas.erase_at(QPoint(event.x, event.y), event.radius)
+            elif event_type is Undo:
+                # Strokes split by the eraser or cleared are gone already, undo the newest one left
+                while self.history and not canvas.remove_trail(self.history.pop()):
+                    pass
+            elif event_type is Clear:
+                for stroke in list(self.stroke_colors):
+                    self.end_stroke(stroke)
+                for stroke_id in self.history:
+                    canvas.remove_trail(stroke_id)
+                self.history = []
+
+    def end_stroke(self, stroke):
+        if self.stroke_colors.pop(stroke, None) is None:
+            return
+        stroke_id = self.canvas.commit_live_trail((self.source, stroke))
+        if stroke_id is not None:
+            self.history.append(stroke_id)
+
+
+def image_pixels(image):
+    # (height, width, 4) view of the pixels of a 32-bit QImage, BGRA on little-endian machines.
+    # Only valid while the image is alive and unmodified.
+    bits = image.constBits()
+    bits.setsize(image.byteCount())
+    rows = np.frombuffer(bits, dtype=np.uint8).reshape(image.height(), image.bytesPerLine())
+    return rows[:, :image.width() * 4].reshape(image.height(), image.width(), 4)
+
+
+def open_session(canvas, options):
+    # Restore the previous session (or --load) into the canvas and start autosaving it. Replaying
+    # and compacting the journal take seconds for large drawings, so they run in the background
+    # while the window shows; the canvas takes the strokes over through session_restored and
+    # holds back input until then, keeping its stroke ids in step with the journal.
+    canvas.restoring = True
+    canvas.session_restored.connect(canvas.finish_restore)
+    threading.Thread(target=restore_session, args=(canvas, options), name="SessionRestore", daemon=True).start()
+
+
+def restore_session(canvas, options):
+    strokes = []
+    loaded = True
+    path = options.load
+    if path is None and options.autosave and os.path.exists(options.autosave):
+        path = options.autosave  # Resume where the last session stopped
+    if path is not None:
+        try:
+            strokes = load_strokes(path, options.ignore_clears)
+        except (OSError, ValueError) as error:
+            print(f"Error: Cannot load {path}: {error}")
+            loaded = False
+        else:
+            print(f"Loaded {len(strokes)} strokes from {path}")
+    if options.autosave and not loaded and os.path.exists(options.autosave):
+        # Compacting would replace the previous session with an empty drawing: keep it next to
+        # the new journal, where --load can bring it back
+        base, extension = os.path.splitext(options.autosave)
+        base += time.strftime("-%Y%m%d-%H%M%S")
+        kept = base + extension
+        number = 1
+        while os.path.exists(kept):
+            kept = f"{base}-{number}{extension}"
+            number += 1
+        try:
+            os.replace(options.autosave, kept)
+        except OSError as error:
+            print(f"Error: Cannot move {options.autosave} aside, not autosaving: {error}")
+            canvas.session_restored.emit(strokes, None)
+            return
+        print(f"Previous autosave journal kept as {kept}")
+    journal_path = None
+    if options.autosave:
+        # Start the journal from the loaded drawing so it does not grow across sessions
+        try:
+            write_journal(options.autosave, strokes)
+        except OSError as error:
+            print(f"Error: Cannot write autosave journal {options.autosave}: {error}")
+        else:
+            journal_path = options.autosave
+    canvas.session_restored.emit(strokes, journal_path)
+
+
+def save_and_export(canvas, options):
+    # Save the finished trails and export them as PNG and SVG next to the drawing file. The PNG
+    # shows the current view, the SVG the whole drawing and at least the default view. The
+    # files are written in the background; only the snapshot is taken on the GUI thread.
+    if canvas.restoring:
+        print("Error: Cannot save the drawing while the previous session is being restored")
+        return
+    canvas.ensure_layers()
+    strokes = list(canvas.trails)
+    image = canvas.committed_layer.toImage()
+    path = options.save_path
+    base = os.path.splitext(path)[0]
+    left, top, right, bottom = 0, 0, canvas.width(), canvas.height()
+    for stroke in strokes:
+        x0, y0, x1, y1 = stroke.bounds()
+        left, top, right, bottom = min(left, x0), min(top, y0), max(right, x1), max(bottom, y1)
+    width, height = right - left, bottom - top
+
+    def write():
+        try:
+            save_drawing(path, strokes)
+            image.save(base + ".png")
+            export_svg(base + ".svg", strokes, width, height, canvas.background_color.name(), left, top)
+        except OSError as error:
+            print(f"Error: Cannot save the drawing: {error}")
+            return
+        print(f"Drawing saved to {path}, {base}.png and {base}.svg")
+
+    threading.Thread(target=write, name="SaveDrawing", daemon=True).start()
 
 
 class MainWindow(QMainWindow):
 
     pointer_position_changed = pyqtSignal(QPoint)
     pointer_color_and_thickness_changed = pyqtSignal(QColor, int)
+    camera_opened = pyqtSignal(int, object)
 
-    def __init__(self):
+    def __init__(self, options=None):
         super().__init__()
+        self.options = options if options is not None else parse_args([])
         self.setWindowTitle("AIR WRITING")
         self.resize(1600, 600)  # Set initial size of the window
         
@@ -167,18 +869,31 @@ class MainWindow(QMainWindow):
         layout.addWidget(self.info_button, 0, 0, 1, 1, Qt.AlignTop | Qt.AlignRight)
         
         # Drawing canvas
-        self.drawing_canvas = DrawingCanvas(main_window=self)
+        self.drawing_canvas = DrawingCanvas(main_window=self, tile_cache_bytes=self.options.tile_cache_mb * 1024 * 1024)
+        self.drawing_canvas.simplifier = StrokeSimplifier(self.options.dedupe_distance, self.options.simplify_tolerance)
         layout.addWidget(self.drawing_canvas, 0, 1, 1, 1)
 
-        self.distance_costant = 70
-        self.new_line = False
-
-        self.punch_treshold = 20
-
-        self.max_hand_distance = 160  # Maximum distance of the hand from the camera
-        self.min_hand_distance = 20  # Minimum distance of the hand from the camera
-        self.max_stroke_thickness = 15  # Maximum stroke thickness
-        self.min_stroke_thickness = 1  # Minimum stroke thickness
+        # Gesture recognition runs in the Qt-free engine; the window applies the events it publishes,
+        # and those of a remote engine with --connect
+        bus = EventBus()
+        self.pointer_filter = pointer_filter_from_arguments(self.options)
+        self.engine = AirWritingEngine(bus=bus, pointer_filter=self.pointer_filter)
+        self.events = bus.subscribe()
+        self.event_consumer = CanvasEventConsumer(self)
+        self.event_server = None
+        if self.options.serve:
+            self.event_server = EventServer(bus, *parse_address(self.options.serve))
+            if self.event_server.start():
+                print(f"Serving drawing events on {self.event_server.host}:{self.event_server.port}")
+        # Remote events come through a bus of their own, so they are never taken for the local
+        # user's (and are not served again)
+        self.remote_events = None
+        if self.options.connect:
+            remote_bus = EventBus()
+            self.remote_events = remote_bus.subscribe()
+            self.remote_consumer = RemoteEventConsumer(self.drawing_canvas, self.options.connect)
+            threading.Thread(target=relay_events, args=(*parse_address(self.options.connect), remote_bus),
+                             name="EventClient", daemon=True).start()
         
         # Button to exit the application
         self.exit_button = QPushButton("EXIT")
@@ -206,14 +921,20 @@ class MainWindow(QMainWindow):
         self.buttonUNDO.setStyleSheet("color: white; background-color: rgba(180, 180, 180, 160); height: 80px;")
         self.buttonUNDO.setFont(QFont("Arial", 16, QFont.Bold))  
 
+        self.buttonERASER = QPushButton("ERASER")
+        self.buttonERASER.setStyleSheet("color: black; background-color: rgba(255, 255, 255, 160); height: 80px;")
+        self.buttonERASER.setFont(QFont("Arial", 16, QFont.Bold))
+
         self.current_color = Qt.blue
+        self.eraser_active = False  # While active, pinching erases the finished strokes under the pointer
 
-        # Connect buttons to select stroke color
-        self.buttonBLUE.clicked.connect(lambda: self.select_color(Qt.blue))
-        self.buttonRED.clicked.connect(lambda: self.select_color(Qt.red))
-        self.buttonGREEN.clicked.connect(lambda: self.select_color(Qt.green))
+        # Connect buttons to select stroke color; like the gestures they go through the engine
+        self.buttonBLUE.clicked.connect(lambda: self.engine.select_color("blue"))
+        self.buttonRED.clicked.connect(lambda: self.engine.select_color("red"))
+        self.buttonGREEN.clicked.connect(lambda: self.engine.select_color("green"))
 
-        self.buttonUNDO.clicked.connect(self.undo_last_stroke)
+        self.buttonUNDO.clicked.connect(self.engine.undo)
+        self.buttonERASER.clicked.connect(self.engine.select_eraser)
 
         self.undo_enabled = True  
 
@@ -229,6 +950,7 @@ class MainWindow(QMainWindow):
         button_layout.addWidget(self.buttonRED)
         button_layout.addWidget(self.buttonGREEN)
         button_layout.addWidget(self.buttonUNDO)
+        button_layout.addWidget(self.buttonERASER)
 
         # Add the frame to the main layout
         layout.addWidget(button_frame, 0, 1, 1, 1, Qt.AlignTop)
@@ -242,38 +964,143 @@ class MainWindow(QMainWindow):
         self.clear_button = QPushButton("Clear")
         self.clear_button.setFont(font)
         self.clear_button.setStyleSheet("QPushButton { text-transform: uppercase; }")
-        self.clear_button.clicked.connect(self.clear_canvas)
+        self.clear_button.clicked.connect(self.engine.clear_canvas)
         layout.addWidget(self.clear_button, 1, 1, 1, 1, Qt.AlignBottom | Qt.AlignRight)
         
-        # Initialize video capture
+        # Initialize video capture and the capture/inference pipeline feeding update_frame
         self.video_capture = None
         self.selected_camera_index = None
+        self.pipeline = None
+        self.opening_camera = False  # A camera is being opened in the background
+        self.camera_opened.connect(self.start_pipeline)
+
+        # Warm the camera cache so the selection dialog can list the cameras right away
+        threading.Thread(target=self.warm_camera_cache, name="CameraDiscovery", daemon=True).start()
+        self.display_buffer = None  # Reused downscaled RGB frame shown in video_label
+        self.recorder = None  # SessionRecorder of --record, started with the first camera
 
-        # Initialize MediaPipe Hands
-        self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands()
-        self.mp_drawing_utils = mp.solutions.drawing_utils
+        # Initialize MediaPipe Hands in the background; it is usually ready before a camera is selected
+        self.hand_model = HandModelLoader(self.options.model_complexity, self.options.max_num_hands)
+        self.hands = None
 
         self.hands_color = (255, 0, 0)
         
-        # Starting the timer to update the video frame
+        # Per-stage timings with an optional FPS/latency overlay on the video, toggled with F3
+        self.profiler = StageProfiler(enabled=self.options.profile or self.options.profile_export is not None)
+        self.drawing_canvas.profiler = self.profiler
+        self.profile_shortcut = QShortcut(QKeySequence("F3"), self)
+        self.profile_shortcut.activated.connect(self.toggle_profiling)
+
+        # Restore the previous session and keep autosaving the drawing; Ctrl+S saves and exports it
+        open_session(self.drawing_canvas, self.options)
+        self.save_shortcut = QShortcut(QKeySequence("Ctrl+S"), self)
+        self.save_shortcut.activated.connect(lambda: save_and_export(self.drawing_canvas, self.options))
+
+        # Starting the timer that consumes processed frames from the pipeline
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_frame)
         self.timer.start(10)  
 
     
     def select_camera(self):
-        dialog = CameraSelectionDialog(self)
-        if dialog.exec_() == QDialog.Accepted:
+        if self.opening_camera:
+            return
+        # The camera in use is not probed again: busy, it could fail to open and drop off the list
+        in_use = {self.selected_camera_index: self.video_capture} if self.video_capture is not None else None
+        dialog = CameraSelectionDialog(self, self.options.camera_probe_timeout, self.options.max_cameras, in_use)
+        if dialog.exec_() == QDialog.Accepted and dialog.selected_camera_index() is not None:
             self.selected_camera_index = dialog.selected_camera_index()
-            if self.video_capture is not None:
-                self.video_capture.release()
-            self.video_capture = cv2.VideoCapture(self.selected_camera_index)
-            if not self.video_capture.isOpened():
-                print(f"Error: Cannot open camera {self.selected_camera_index}")
-                self.selected_camera_index = None
-            else:
-                print(f"Using camera {self.selected_camera_index}")
+            self.stop_pipeline()
+            # Opening and configuring a camera can block for seconds, keep it off the GUI thread
+            self.opening_camera = True
+            self.select_camera_button.setEnabled(False)
+            threading.Thread(target=self.open_camera, args=(self.selected_camera_index,), name="CameraOpen", daemon=True).start()
+
+
+    def warm_camera_cache(self):
+        from cameras import discover_cameras
+        discover_cameras(self.options.max_cameras, self.options.camera_probe_timeout)
+
+
+    def open_camera(self, index):
+        from cameras import open_camera
+        options = self.options
+        video_capture = open_camera(index, options.camera_width, options.camera_height, options.camera_fps,
+                                    not options.no_mjpg, options.camera_buffer_size)
+        # Still in the background: wait for the hand model if the camera was selected very early
+        waited = time.perf_counter()
+        if not self.hand_model.ready.is_set():
+            self.hand_model.wait()
+            print(f"Waited {(time.perf_counter() - waited) * 1000:.0f} ms for the hand model")
+        self.camera_opened.emit(index, video_capture)
+
+
+    def start_pipeline(self, index, video_capture):
+        self.opening_camera = False
+        self.select_camera_button.setEnabled(True)
+        if video_capture is None:
+            print(f"Error: Cannot open camera {index}")
+            self.selected_camera_index = None
+            return
+        if self.hand_model.hands is None:
+            print(f"Error: Cannot load the hand model: {self.hand_model.error}")
+            video_capture.release()
+            self.selected_camera_index = None
+            return
+        import cv2
+        from pipeline import FramePipeline
+        from roi import RegionOfInterest
+        from tracking import InferenceScheduler
+        self.hands = self.hand_model.hands
+        self.video_capture = video_capture
+        if self.options.record and self.recorder is None:
+            from recording import SessionRecorder
+            self.recorder = SessionRecorder(self.options.record, self.options.record_fps, self.options.record_buffer,
+                                            self.options.record_drop, self.options.record_codec)
+        width = int(video_capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        print(f"Using camera {index} at {width}x{height}, {video_capture.get(cv2.CAP_PROP_FPS):.0f} FPS")
+        scheduler = None
+        if self.options.adaptive:
+            # Run the full model only as often as the target frame rate allows, tracking in between
+            scheduler = InferenceScheduler(self.options.target_fps, self.options.max_detection_interval)
+        # Optionally run the model on a downscaled crop around the last detected hand
+        region = RegionOfInterest(self.options.roi_size, self.options.roi_padding) if self.options.roi else None
+        self.pipeline = FramePipeline(self.video_capture, self.hands, self.profiler, scheduler, region)
+        self.pipeline.start()
+
+
+    def stop_pipeline(self):
+        # Stop the worker threads before releasing the camera they read from
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            self.pipeline = None
+        if self.video_capture is not None:
+            self.video_capture.release()
+            self.video_capture = None
+
+
+    def closeEvent(self, event):
+        self.stop_pipeline()
+        if self.recorder is not None:
+            self.recorder.stop()
+            print(self.recorder.report())
+        if self.event_server is not None:
+            self.event_server.stop()
+        if self.drawing_canvas.journal is not None:
+            self.drawing_canvas.journal.close()
+            self.drawing_canvas.journal = None
+        print(self.drawing_canvas.simplifier.report())
+        if self.options.profile_export:
+            self.profiler.export(self.options.profile_export)
+            print(f"Timings written to {self.options.profile_export}")
+        super().closeEvent(event)
+
+
+    def toggle_profiling(self):
+        self.profiler.enabled = not self.profiler.enabled
+        if not self.profiler.enabled:
+            self.profiler.reset()
 
     
     def show_info(self):
@@ -283,26 +1110,23 @@ class MainWindow(QMainWindow):
             "1. Select a camera to start drawing using hand gestures.\n"
             "2. If you connect your index and thumb, you can draw.\n"
             "3. If you connect your index and thumb above any of the options, it is activated automatically.\n"
-            "4. If you close your hand, you delete the draw."
+            "4. If you close your hand, you delete the draw.\n"
+            "5. Select ERASER and pinch over a stroke to erase part of it; pick a color to draw again."
         )
         QMessageBox.information(self, "Info", info_text)
 
 
     def clear_canvas(self):
-        self.drawing_canvas.trails = []  # Clear the list of trails
-        self.drawing_canvas.current_trail = []  # Also clear the current trail
-        self.drawing_canvas.update()  # Update the display
+        self.drawing_canvas.clear_own_trails()  # Clear the trails drawn here and update the display
 
 
     def undo_last_stroke(self):
         if self.undo_enabled:
-            if self.drawing_canvas.trails:
-                self.drawing_canvas.trails.pop()  # Remove the last stroke from the list of trails
+            self.drawing_canvas.undo_last_trail()  # Remove the last stroke and update the display
             # Set a temporary style to make the undo button less transparent
             self.buttonUNDO.setStyleSheet("color: white; background-color: rgba(180, 180, 180, 255); height: 80px;")
             # Start a timer to restore the original style after a short delay
             QTimer.singleShot(150, lambda: self.buttonUNDO.setStyleSheet("color: white; background-color: rgba(180, 180, 180, 160); height: 80px;"))
-            self.drawing_canvas.update()  # Update the display to remove the deleted stroke
             self.undo_enabled = False
             # Temporarily disable the button for 300ms
             QTimer.singleShot(300, self.enable_undo_button)
@@ -312,8 +1136,19 @@ class MainWindow(QMainWindow):
         self.undo_enabled = True
 
 
+    def select_eraser(self):
+        if not self.eraser_active:
+            self.drawing_canvas.close_line()  # Keep the stroke in progress before erasing
+        self.eraser_active = True
+        self.hands_color = (255, 255, 255)
+        self.buttonERASER.setStyleSheet("color: black; background-color: rgba(255, 255, 255, 255); height: 80px;")
+
+
     def select_color(self, color):
         self.current_color = color
+        if self.eraser_active:
+            self.eraser_active = False
+            self.buttonERASER.setStyleSheet("color: black; background-color: rgba(255, 255, 255, 160); height: 80px;")
         if color == (Qt.blue):
             self.hands_color = (255, 0, 0)
             # Set a temporary style to make the blue button less transparent
@@ -334,163 +1169,325 @@ class MainWindow(QMainWindow):
             QTimer.singleShot(150, lambda: self.buttonGREEN.setStyleSheet("color: white; background-color: rgba(0, 255, 0, 160); height: 80px;"))
 
 
-    def map_distance_to_thickness(self, distance):
-        # Map the hand distance to the stroke thickness
-        
-        # Ensure that normalized_distance is between 0 and 1
-        normalized_distance = max(0, min(1, distance))
-
-        # Linearly map the normalized distance to a stroke thickness
-        thickness_range = self.max_stroke_thickness - self.min_stroke_thickness
-        thickness = self.min_stroke_thickness + normalized_distance * thickness_range
-
-        return thickness
+    def toolbar_zones(self):
+        # Canvas x range of each toolbar button, as laid out now, for the toolbar gestures
+        canvas = self.drawing_canvas
+        zones = []
+        for button, action in ((self.buttonBLUE, "blue"), (self.buttonRED, "red"), (self.buttonGREEN, "green"),
+                               (self.buttonUNDO, "undo"), (self.buttonERASER, "eraser")):
+            left = canvas.mapFromGlobal(button.mapToGlobal(QPoint(0, 0))).x()
+            zones.append((left, left + button.width(), action))
+        return tuple(zones)
 
 
     def update_frame(self):
-        stroke_thickness = 2  # Default value for stroke thickness
-        if self.video_capture is not None:
-            # Read a frame from the webcam
-            ret, frame = self.video_capture.read()
-            if ret:
-                # Flip the frame horizontally (mirror effect)
-                frame = cv2.flip(frame, 1)
-                
-                # Process the frame with MediaPipe Hands
-                result = self.hands.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        if self.drawing_canvas.restoring:
+            return  # The frames are dropped by the pipeline, the events wait in their subscriptions
+        # Apply what the buttons or a remote engine did since the last frame
+        self.event_consumer.detections.clear()
+        self.event_consumer.apply(self.events.get_batch())
+        if self.remote_events is not None:
+            self.remote_consumer.apply(self.remote_events.get_batch())
+        if self.pipeline is not None:
+            # Take the newest processed frame without waiting on the camera or the model
+            packet = self.pipeline.latest()
+            if packet is None:
+                return
+            if packet.ok:
+                # The frame is already mirrored and processed by the pipeline workers
+                frame = packet.frame
+                hands = packet.hands
                 
-                # Calculate hand distance
-                hand_distance = None
+                frame_height, frame_width = frame.shape[:2]
+
+                if self.pointer_filter is not None:
+                    # With --predict auto the pointer is extrapolated by how old the frames are by now
+                    self.pointer_filter.observe_latency(time.perf_counter() - packet.timestamp)
                     
-                # Draw landmarks on the frame if hands are detected
-                if result.multi_hand_landmarks:
-                    for hand_landmark in result.multi_hand_landmarks:
-
-                        # Compute the distance between the four knuckles
-                        knuckle_distances = []
-                        for i in range(0, 20, 4):  # Iterate over knuckle points
-                            knuckle1 = hand_landmark.landmark[i]
-                            knuckle2 = hand_landmark.landmark[i+1]
-                            distance = math.sqrt((knuckle1.x - knuckle2.x) ** 2 + (knuckle1.y - knuckle2.y) ** 2) * frame.shape[1] / 2
-                            knuckle_distances.append(distance)
-                        
-                        # Average the distances between the knuckles
-                        avg_distance = sum(knuckle_distances) / len(knuckle_distances)
-                        
-                        # Convert average knuckle distance to distance from camera (approximation)
-                        hand_distance = (avg_distance - self.min_hand_distance) / (self.max_hand_distance - self.min_hand_distance)
-
-                        if hand_distance is not None:
-                            # Convert hand distance to stroke thickness
-                            stroke_thickness = self.map_distance_to_thickness(hand_distance)
-
-                        # Compute the distance between the tip of the thumb and index
-                        thumb_tip = hand_landmark.landmark[4]
-                        index_tip = hand_landmark.landmark[8]
-                        distance = math.sqrt((thumb_tip.x - index_tip.x) ** 2 + (thumb_tip.y - index_tip.y) ** 2) * frame.shape[1] / 2
-
-                        # Set the maximum writing distance based on the hand distance from the screen
-                        max_writing_distance = (hand_distance) * self.distance_costant
-                        
-                        # Draw detection with blue color if distance is greater than the maximum writing value
-                        if distance < max_writing_distance:
-                            self.mp_drawing_utils.draw_landmarks(frame, hand_landmark, self.mp_hands.HAND_CONNECTIONS, landmark_drawing_spec=self.mp_drawing_utils.DrawingSpec(color= self.hands_color, thickness=int(stroke_thickness), circle_radius=4))
-                        else:
-                            self.mp_drawing_utils.draw_landmarks(frame, hand_landmark, self.mp_hands.HAND_CONNECTIONS, landmark_drawing_spec=self.mp_drawing_utils.DrawingSpec(color=(255, 255, 255), thickness=int(stroke_thickness), circle_radius=4)) 
-                        
-                        # Compute the average position between the tip of the thumb and index
-                        cx = int((thumb_tip.x + index_tip.x) * frame.shape[1] / 2)
-                        cy = int((thumb_tip.y + index_tip.y) * frame.shape[0] / 2)
-                        
-                        # Convert coordinates to be on the right side of the application
-                        canvas_height = self.drawing_canvas.height()
-                        canvas_width = self.drawing_canvas.width()
-                        cx_canvas = int(cx * canvas_width / frame.shape[1])
-                        cy_canvas = int(cy * canvas_height / frame.shape[0])
-
-                        if cy_canvas > 120:
-                            # Add the point to the drawing canvas with the calculated thickness and color
-                            if distance < max_writing_distance:
-                                if not self.new_line:
-                                    self.drawing_canvas.add_point(QPoint(cx_canvas, cy_canvas), stroke_thickness, self.current_color)
-                                else:
-                                    self.drawing_canvas.start_new_line(QPoint(cx_canvas, cy_canvas), stroke_thickness, self.current_color)
-                                    self.new_line = False  # Set the flag to False to continue the existing stroke
-                            else:
-                                if not self.new_line:
-                                    self.drawing_canvas.close_line()
-                                self.new_line = True  # Set the flag to True to start a new stroke
-                        elif cy_canvas < 100:
-                            if not self.new_line:
-                                self.drawing_canvas.close_line()
-                            self.new_line = True  # Set the flag to True to start a new stroke
-
-                            if distance < max_writing_distance: 
-                                if 20 < cx_canvas < 170:
-                                    self.select_color(Qt.blue)
-                                elif 190 < cx_canvas < 340:
-                                    self.select_color(Qt.red)
-                                elif 360 < cx_canvas < 510:
-                                    self.select_color(Qt.green)
-                                elif 530 < cx_canvas < 680:
-                                    self.undo_last_stroke()
-
-
-                        # Update the pointer with the average position and color
-                        self.pointer_position_changed.emit(QPoint(cx_canvas, cy_canvas))
-                        self.pointer_color_and_thickness_changed.emit(QColor(self.current_color), int(stroke_thickness))
-
-            
-                        # Compute the distance between the knuckles and the point between the middle and proximal phalanx of each finger
-                        knuckle_to_finger_point_distances = []
-                        for i in range(5, 18, 4):  # Knuckle points and points between middle and proximal phalanx of each finger
-                            knuckle = hand_landmark.landmark[i]
-                            middle_to_proximal = hand_landmark.landmark[i+2]
-                            distance = math.sqrt((knuckle.x - middle_to_proximal.x) ** 2 + (knuckle.y - middle_to_proximal.y) ** 2) * frame.shape[1] / 2
-                            knuckle_to_finger_point_distances.append(distance)
-                        
-                        # Compute the average distance between the knuckle distances and the point between the middle and proximal phalanx of each finger
-                        avg_distance = sum(knuckle_to_finger_point_distances) / len(knuckle_to_finger_point_distances)
-                        
-                        # If the average distance is below a certain threshold, consider the hand as a closed fist
-                        if avg_distance < self.punch_treshold:
-                            self.clear_canvas()  # Call the clear_canvas() function
-
-                # Convert the frame to QImage format
-                rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                h, w, ch = rgb_image.shape
+                # Apply gestures if hands are detected; the engine publishes the events of the frame
+                # as one batch
+                if len(hands):
+                    with self.profiler.stage("gestures"):
+                        self.engine.canvas_width = self.drawing_canvas.width()
+                        self.engine.canvas_height = self.drawing_canvas.height()
+                        self.engine.gestures.toolbar_zones = self.toolbar_zones()
+                        self.engine.process_frame(hands, frame_width, frame_height, packet.timestamp)
+                        self.event_consumer.apply(self.events.get_batch())
+
+                # Downscale to the label size before anything else touches the pixels
+                display_image = self.prepare_display_image(packet)
+                # The pixels are copied out, the workers may capture into the buffers again
+                packet.release()
+                if display_image is None:
+                    return
+
+                # Draw landmarks on the downscaled image; colors are BGR, the image is RGB
+                scale = display_image.shape[1] / frame_width
+                with self.profiler.stage("draw_landmarks"):
+                    for hand_index, color, thickness in self.event_consumer.detections:
+                        draw_landmarks(display_image, hands[hand_index], color[::-1], max(1, round(thickness * scale)),
+                                       circle_radius=max(1, round(4 * scale)))
+
+                # Wrap the buffer without copying it
+                h, w, ch = display_image.shape
                 bytes_per_line = ch * w
-                q_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format_RGB888)
-                
-                # Resize the image to fit the label size
-                q_image = q_image.scaled(self.video_label.size(), Qt.KeepAspectRatio)
+                q_image = QImage(display_image.data, w, h, bytes_per_line, QImage.Format_RGB888)
+
+                if self.profiler.enabled:
+                    self.draw_profile_overlay(q_image)
+
+                if self.recorder is not None and self.recorder.wants_frame(packet.timestamp):
+                    # Two copies into the recording ring; everything else happens in the encoder thread
+                    with self.profiler.stage("record"):
+                        snapshot = self.drawing_canvas.snapshot()  # Keeps the pixels alive while they are copied
+                        self.recorder.submit(display_image, image_pixels(snapshot), packet.timestamp)
                 
-                # Update the image in the video label
-                pixmap = QPixmap.fromImage(q_image)
+                # Update the image in the video label, the only copy of the displayed pixels
+                with self.profiler.stage("from_image"):
+                    pixmap = QPixmap.fromImage(q_image)
                 self.video_label.setPixmap(pixmap)
+
+                if self.profiler.enabled:
+                    # The canvas reports the capture-to-paint latency once it has painted this frame
+                    self.drawing_canvas.pending_capture_time = packet.timestamp
+                    self.drawing_canvas.update_pointer()
                 
             else:
                 # If reading the frame fails, show an error message
                 self.video_label.setText("Error reading frame from webcam")
 
 
+    def prepare_display_image(self, packet):
+        # Resize the frame to fit the label (keeping its aspect ratio) into a reused buffer, converting
+        # it to RGB only if the inference worker has not already done so
+        frame_height, frame_width = packet.frame.shape[:2]
+        label_size = self.video_label.size()
+        scale = min(label_size.width() / frame_width, label_size.height() / frame_height)
+        width, height = int(frame_width * scale), int(frame_height * scale)
+        if width < 1 or height < 1:
+            return None
+        if self.display_buffer is None or self.display_buffer.shape[:2] != (height, width):
+            self.display_buffer = np.empty((height, width, 3), dtype=np.uint8)
+
+        import cv2  # Already loaded by the HandModelLoader, this is a lookup
+        source = packet.rgb if packet.rgb is not None else packet.frame
+        with self.profiler.stage("resize"):
+            cv2.resize(source, (width, height), dst=self.display_buffer, interpolation=cv2.INTER_LINEAR)
+        if packet.rgb is None:
+            with self.profiler.stage("cvt_color_display"):
+                cv2.cvtColor(self.display_buffer, cv2.COLOR_BGR2RGB, dst=self.display_buffer)
+        return self.display_buffer
+
+
+    def draw_profile_overlay(self, q_image):
+        painter = QPainter(q_image)
+        painter.setFont(QFont("Arial", 12, QFont.Bold))
+        text = self.profiler.overlay_text()
+        if self.pipeline is not None and self.pipeline.scheduler is not None:
+            text += f" | detect every {self.pipeline.scheduler.interval}"
+        if self.recorder is not None:
+            text += f" | REC {self.recorder.written} frames, {self.recorder.dropped} dropped"
+        painter.setPen(Qt.black)
+        painter.drawText(11, 21, text)
+        painter.setPen(Qt.yellow)
+        painter.drawText(10, 20, text)
+        painter.end()
+
+
+class StationSink(GestureSink):
+    # One user of the shared wall: own color, trail in progress, eraser and undo history. A fist
+    # clears only this user's strokes.
+    tool_colors = CanvasEventConsumer.tool_colors
+
+    def __init__(self, canvas, station, color):
+        self.canvas = canvas
+        self.station = station
+        self.color = QColor(color)
+        self.eraser_active = False
+        self.history = []  # Stroke ids of this user's finished trails, oldest first
+
+    def start_line(self, x, y, thickness):
+        if self.eraser_active:
+            self.canvas.erase_at(QPoint(x, y), eraser_radius(thickness))
+            return
+        self.canvas.add_live_point(self.station, QPoint(x, y), thickness, self.color, new_line=True)
+
+    def add_point(self, x, y, thickness):
+        if self.eraser_active:
+            self.canvas.erase_at(QPoint(x, y), eraser_radius(thickness))
+            return
+        self.canvas.add_live_point(self.station, QPoint(x, y), thickness, self.color)
+
+    def close_line(self):
+        stroke_id = self.canvas.commit_live_trail(self.station)
+        if stroke_id is not None:
+            self.history.append(stroke_id)
+
+    def toolbar_action(self, action):
+        if action == "undo":
+            # Strokes split by the eraser or cleared are gone already, undo the newest one left
+            while self.history and not self.canvas.remove_trail(self.history.pop()):
+                pass
+        elif action == "eraser":
+            self.close_line()
+            self.eraser_active = True
+        else:
+            self.eraser_active = False
+            self.color = QColor(self.tool_colors[action])
+
+    def pointer_moved(self, x, y, thickness):
+        color = QColor(Qt.white) if self.eraser_active else self.color
+        self.canvas.set_station_pointer(self.station, QPoint(x, y), color, thickness)
+
+    def clear(self):
+        self.close_line()
+        for stroke_id in self.history:
+            self.canvas.remove_trail(stroke_id)
+        self.history = []
+
+
+class WallWindow(QMainWindow):
+    # Shared drawing wall for several stations (--stations): one capture+inference process per
+    # camera feeds landmarks to this window, which applies each station's gestures to one canvas
+    station_colors = (Qt.blue, Qt.red, Qt.green, Qt.magenta, Qt.darkYellow, Qt.cyan, Qt.darkBlue, Qt.darkRed)
+
+    def __init__(self, options):
+        super().__init__()
+        self.options = options
+        self.setWindowTitle("AIR WRITING WALL")
+        self.resize(1600, 900)
+
+        self.drawing_canvas = DrawingCanvas(tile_cache_bytes=options.tile_cache_mb * 1024 * 1024)
+        self.drawing_canvas.simplifier = StrokeSimplifier(options.dedupe_distance, options.simplify_tolerance)
+        self.drawing_canvas.pointer_position = QPoint(-100, -100)  # Each station has its own pointer
+        self.setCentralWidget(self.drawing_canvas)
+
+        self.gestures = {}
+        self.sinks = {}
+        for station in range(len(options.stations)):
+            self.gestures[station] = GestureInterpreter(pointer_filter_from_arguments(options))
+            self.sinks[station] = StationSink(self.drawing_canvas, station,
+                                              self.station_colors[station % len(self.station_colors)])
+
+        open_session(self.drawing_canvas, options)
+        self.save_shortcut = QShortcut(QKeySequence("Ctrl+S"), self)
+        self.save_shortcut.activated.connect(lambda: save_and_export(self.drawing_canvas, self.options))
+
+        settings = {
+            "capture": (options.camera_width, options.camera_height, options.camera_fps,
+                        not options.no_mjpg, options.camera_buffer_size),
+            "model_complexity": options.model_complexity,
+            "max_num_hands": options.max_num_hands,
+            "adaptive": options.adaptive,
+            "target_fps": options.target_fps,
+            "max_detection_interval": options.max_detection_interval,
+            "roi": options.roi,
+            "roi_size": options.roi_size,
+            "roi_padding": options.roi_padding,
+        }
+        from stations import StationPool
+        self.pool = StationPool(options.stations, settings)
+        self.pool.start()
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.update_frames)
+        self.timer.start(10)
+
+    def update_frames(self):
+        # Apply every frame received from the stations, in arrival order, so no stroke loses points
+        canvas = self.drawing_canvas
+        if canvas.restoring:
+            return
+        for frame in self.pool.poll():
+            pointer_filter = self.gestures[frame.station].pointer_filter
+            if pointer_filter is not None:
+                pointer_filter.observe_latency(time.perf_counter() - frame.timestamp)
+            if len(frame.hands):
+                self.gestures[frame.station].process_frame(frame.hands, frame.frame_width, frame.frame_height,
+                                                           canvas.width(), canvas.height(), frame.timestamp,
+                                                           self.sinks[frame.station])
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        self.pool.stop()
+        if self.drawing_canvas.journal is not None:
+            self.drawing_canvas.journal.close()
+            self.drawing_canvas.journal = None
+        print(self.drawing_canvas.simplifier.report())
+        super().closeEvent(event)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="AIR WRITING")
+    parser.add_argument("--profile", action="store_true", help="Collect per-stage timings and show the FPS/latency overlay (toggle with F3)")
+    parser.add_argument("--profile-export", metavar="PATH", help="Write the timings to PATH (.csv or .json) when the window closes")
+    parser.add_argument("--adaptive", action="store_true", help="Run the hand model every N frames and track landmarks in between, adapting N to the target FPS")
+    parser.add_argument("--target-fps", type=float, default=30.0, help="Frame rate the adaptive mode tries to keep (default: 30)")
+    parser.add_argument("--max-detection-interval", type=int, default=8, help="Largest N the adaptive mode may use (default: 8)")
+    parser.add_argument("--roi", action="store_true", help="Run the hand model on a crop around the last detected hand, searching the full frame when it is lost")
+    parser.add_argument("--roi-size", type=int, default=256, help="Longest side in pixels the ROI crop is downscaled to (default: 256)")
+    parser.add_argument("--roi-padding", type=float, default=0.5, help="Margin around the hand in the ROI crop, relative to the hand size (default: 0.5)")
+    parser.add_argument("--dedupe-distance", type=float, default=1.5, help="Drop samples closer than this many pixels to the previous point, 0 to keep all (default: 1.5)")
+    parser.add_argument("--simplify-tolerance", type=float, default=0.75, help="Ramer-Douglas-Peucker tolerance in pixels for finished strokes, 0 to disable (default: 0.75)")
+    parser.add_argument("--model-complexity", type=int, choices=(0, 1), default=1, help="MediaPipe Hands model complexity, 0 is faster (default: 1)")
+    parser.add_argument("--max-num-hands", type=int, default=2, help="Maximum number of hands MediaPipe looks for (default: 2)")
+    parser.add_argument("--camera-width", type=int, default=640, help="Requested capture width, 0 for the camera default (default: 640)")
+    parser.add_argument("--camera-height", type=int, default=480, help="Requested capture height, 0 for the camera default (default: 480)")
+    parser.add_argument("--camera-fps", type=float, default=30.0, help="Requested capture frame rate, 0 for the camera default (default: 30)")
+    parser.add_argument("--camera-buffer-size", type=int, default=1, help="Frames the driver may queue, 0 for the camera default (default: 1)")
+    parser.add_argument("--no-mjpg", action="store_true", help="Do not request MJPG from the camera")
+    parser.add_argument("--camera-probe-timeout", type=float, default=2.0, help="Seconds camera discovery waits for a device to answer (default: 2)")
+    parser.add_argument("--autosave", metavar="PATH", default="autosave.awj", help="Journal the drawing to PATH as it changes and restore it on the next start (default: autosave.awj)")
+    parser.add_argument("--no-autosave", dest="autosave", action="store_const", const=None, help="Do not journal or restore the drawing")
+    parser.add_argument("--load", metavar="PATH", help="Start from a saved drawing (.awd) or journal (.awj) instead of the autosaved session")
+    parser.add_argument("--ignore-clears", action="store_true", help="When loading a journal, keep the strokes removed by clearing the canvas")
+    parser.add_argument("--save-path", metavar="PATH", default="drawing.awd", help="Drawing file written by Ctrl+S, with .png and .svg exports next to it (default: drawing.awd)")
+    add_pointer_filter_arguments(parser)
+    parser.add_argument("--tile-cache-mb", type=int, default=64, help="Memory for rendered canvas tiles, in MB; least recently viewed tiles are dropped first (default: 64)")
+    parser.add_argument("--no-consent", action="store_true", help="Skip the camera consent prompt and the welcome dialog, for kiosks where consent is given by the deployment")
+    parser.add_argument("--record", metavar="PATH", help="Record the annotated camera feed next to the canvas to a video file, encoded in the background")
+    parser.add_argument("--record-fps", type=float, default=30.0, help="Frame rate of the recording (default: 30)")
+    parser.add_argument("--record-buffer", type=int, default=8, help="Frames that may wait for the encoder before frames are dropped (default: 8)")
+    parser.add_argument("--record-drop", choices=("oldest", "newest"), default="oldest", help="Frame dropped when the encoder falls behind: the oldest waiting one, or the newest submitted (default: oldest)")
+    parser.add_argument("--record-codec", default="mp4v", help="FourCC of the recording codec (default: mp4v)")
+    parser.add_argument("--serve", metavar="[HOST:]PORT", help="Stream the drawing events to clients of a TCP socket, e.g. other renderers (host defaults to 127.0.0.1)")
+    parser.add_argument("--connect", metavar="HOST:PORT", help="Also draw the events of a remote engine (python engine.py) or app started with --serve")
+    parser.add_argument("--stations", type=int, nargs="+", metavar="CAMERA", help="Shared wall mode: one capture+inference process per camera index, each user with their own color and undo")
+    parser.add_argument("--max-cameras", type=int, default=8, help="Camera indices probed when the devices cannot be listed (default: 8)")
+    # Unknown arguments are left to Qt
+    options, _ = parser.parse_known_args(argv)
+    return options
+
+
 if __name__ == '__main__':
 
-    # Inform the user and obtain consent
-    print("Welcome to the air drawing app. This app uses the camera to detect motion and allow you to draw on the screen.")
-    consent = input("Do you agree to allow access to the camera? (y/n): ")
+    options = parse_args()
 
-    if consent.lower() != 'y':
-        print("Permission denied. The app cannot access the camera.")
-        exit()
+    # Inform the user and obtain consent, unless it was given for the whole deployment (kiosks)
+    if not options.no_consent:
+        print("Welcome to the air drawing app. This app uses the camera to detect motion and allow you to draw on the screen.")
+        prompt_start = time.perf_counter()
+        consent = input("Do you agree to allow access to the camera? (y/n): ")
+        launch_time += time.perf_counter() - prompt_start  # Waiting for the answer is not startup time
+
+        if consent.lower() != 'y':
+            print("Permission denied. The app cannot access the camera.")
+            exit()
 
     app = QApplication(sys.argv)
     
-    window = MainWindow()
-    window.show()
-    
-    # Call show_info after showing the main window
-    window.show_info()
+    if options.stations:
+        window = WallWindow(options)
+        window.show()
+    else:
+        window = MainWindow(options)
+        window.show()
+
+    # Runs once the event loop has shown the window
+    QTimer.singleShot(0, lambda: print(f"Window shown in {(time.perf_counter() - launch_time) * 1000:.0f} ms"))
+    if not options.stations and not options.no_consent:
+        # Call show_info after showing the main window
+        window.show_info()
     
     sys.exit(app.exec_())
     
\ No newline at end of file
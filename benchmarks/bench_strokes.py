@@ -0,0 +1,114 @@
+"""Memory and paint-time benchmark for the stroke storage used by DrawingCanvas.
+
+Compares the original one-object-per-sample storage with the array-backed Stroke store.
+Run from the project root:
+
+    python -m benchmarks.bench_strokes [--points-per-stroke 20] [--counts 1000 10000 100000]
+"""
+import argparse
+import os
+import random
+import time
+import tracemalloc
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QPoint, Qt
+from PyQt5.QtGui import QColor, QImage, QPainter, QPen
+from PyQt5.QtWidgets import QApplication
+
+from app import DrawingCanvas
+from strokes import Stroke, StrokeStore
+
+CANVAS_SIZE = 800
+
+
+class PointWithThickness:
+    # The original per-sample storage, kept here as the baseline
+    def __init__(self, point, thickness, color):
+        self.point = point
+        self.thickness = thickness
+        self.color = color
+
+
+def random_samples(stroke_count, points_per_stroke, seed=0):
+    rng = random.Random(seed)
+    colors = [Qt.blue, Qt.red, Qt.green]
+    for _ in range(stroke_count):
+        x, y = rng.randrange(CANVAS_SIZE), rng.randrange(CANVAS_SIZE)
+        thickness = rng.uniform(1, 15)
+        points = []
+        for _ in range(points_per_stroke):
+            x = min(max(x + rng.randint(-6, 6), 0), CANVAS_SIZE - 1)
+            y = min(max(y + rng.randint(-6, 6), 0), CANVAS_SIZE - 1)
+            thickness = min(max(thickness + rng.uniform(-0.5, 0.5), 1), 15)
+            points.append((x, y, thickness))
+        yield rng.choice(colors), points
+
+
+def build_legacy(samples):
+    trails = []
+    for color, points in samples:
+        trails.append([PointWithThickness(QPoint(x, y), thickness, color) for x, y, thickness in points])
+    return trails
+
+
+def build_compact(samples):
+    trails = StrokeStore()
+    for color, points in samples:
+        stroke = Stroke(QColor(color).rgba())
+        for x, y, thickness in points:
+            stroke.append(x, y, thickness)
+        trails.append(stroke)
+    return trails
+
+
+def paint_legacy(painter, trails):
+    # Same loop DrawingCanvas.paintEvent used before strokes were batched
+    for trail in trails:
+        for i in range(1, len(trail)):
+            pen = QPen(trail[i].color)
+            pen.setWidth(int(trail[i].thickness))
+            painter.setPen(pen)
+            painter.drawLine(trail[i - 1].point, trail[i].point)
+
+
+def paint_compact(painter, trails):
+    for trail in trails:
+        DrawingCanvas.draw_trail(painter, trail)
+
+
+def measure(build, paint, samples):
+    tracemalloc.start()
+    trails = build(samples)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    image = QImage(CANVAS_SIZE, CANVAS_SIZE, QImage.Format_RGB32)
+    image.fill(QColor(210, 210, 210))
+    painter = QPainter(image)
+    start = time.perf_counter()
+    paint(painter, trails)
+    elapsed = time.perf_counter() - start
+    painter.end()
+    return memory, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--points-per-stroke", type=int, default=20)
+    args = parser.parse_args()
+
+    app = QApplication([])  # Needed for QPainter on some platforms
+    print(f"{'strokes':>8} {'storage':>8} {'memory MiB':>11} {'paint s':>9}")
+    for count in args.counts:
+        samples = list(random_samples(count, args.points_per_stroke))
+        for name, build, paint in (("legacy", build_legacy, paint_legacy), ("compact", build_compact, paint_compact)):
+            memory, elapsed = measure(build, paint, samples)
+            print(f"{count:>8} {name:>8} {memory / 2 ** 20:>11.2f} {elapsed:>9.3f}")
+    del app
+
+
+if __name__ == "__main__":
+    main()
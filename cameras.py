@@ -0,0 +1,185 @@
+import glob
+import re
+import sys
+import threading
+import time
+
+import cv2
+
+# Resolutions tried on every camera found, so the selection dialog can show what the device supports
+CANDIDATE_MODES = ((320, 240), (640, 480), (800, 600), (1280, 720), (1920, 1080))
+
+
+class CameraInfo:
+    # A camera that opened and delivered a frame during discovery
+    __slots__ = ("index", "width", "height", "fps", "modes")
+
+    def __init__(self, index, width, height, fps, modes):
+        self.index = index
+        self.width = width  # Resolution the camera opened with
+        self.height = height
+        self.fps = fps  # Frame rate reported by the driver, 0 if unknown
+        self.modes = modes  # (width, height, fps) of the CANDIDATE_MODES the driver accepted
+
+    def label(self):
+        text = f"Camera {self.index} ({self.width}x{self.height}"
+        if self.fps:
+            text += f" @ {self.fps:.0f} FPS"
+        text += ")"
+        if self.modes:
+            text += ", up to {}x{}".format(*max(self.modes)[:2])
+        return text
+
+
+_cache_lock = threading.Lock()  # Guards _cache only, never held while probing
+_cache = {"time": None, "cameras": None, "probing": None}  # probing: Event set when the probe in progress ends
+
+
+def candidate_indices(max_index=8):
+    # On Linux only the existing /dev/video* nodes are worth probing, elsewhere try the first indices
+    if sys.platform.startswith("linux"):
+        devices = glob.glob("/dev/video*")
+        if devices:
+            return sorted(int(match.group(1)) for match in map(re.compile(r"/dev/video(\d+)$").match, devices) if match)
+    return list(range(max_index))
+
+
+def probe_camera(index, modes=CANDIDATE_MODES, found=None, modes_deadline=None):
+    # CameraInfo for the camera at index, or None if it cannot be opened or does not deliver frames.
+    # Opening and reading one frame decide whether the camera exists; found(info) is called right
+    # then. The modes are enumerated afterwards, each one a stream restart on V4L2, until
+    # modes_deadline (time.monotonic()); info.modes grows as they are found.
+    capture = cv2.VideoCapture(index)
+    try:
+        if not capture.isOpened():
+            return None
+        ok, _ = capture.read()
+        if not ok:
+            return None
+        width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = capture.get(cv2.CAP_PROP_FPS)
+        info = CameraInfo(index, width, height, fps, [])
+        if found is not None:
+            found(info)
+        for mode_width, mode_height in modes:
+            if modes_deadline is not None and time.monotonic() >= modes_deadline:
+                break
+            capture.set(cv2.CAP_PROP_FRAME_WIDTH, mode_width)
+            capture.set(cv2.CAP_PROP_FRAME_HEIGHT, mode_height)
+            if (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)) == mode_width
+                    and int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)) == mode_height):
+                # A new list rather than append, so readers never see it change under them
+                info.modes = info.modes + [(mode_width, mode_height, capture.get(cv2.CAP_PROP_FPS))]
+        return info
+    finally:
+        capture.release()
+
+
+def describe_capture(index, capture):
+    # CameraInfo of a camera that is already open, read from its settings without touching the stream
+    return CameraInfo(index, int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                      capture.get(cv2.CAP_PROP_FPS), [])
+
+
+def discover_cameras(max_index=8, timeout=2.0, max_age=60.0, refresh=False, in_use=None, modes_timeout=2.0):
+    # Probe the candidate cameras in parallel and return the ones that work, sorted by index.
+    # A camera is listed if it opens and delivers a frame within timeout seconds; a probe still
+    # running then (e.g. a missing device the backend keeps waiting on) is left behind in its
+    # daemon thread. The resolutions the listed cameras support are enumerated during another
+    # modes_timeout seconds at most. in_use maps the indices of cameras the app has open to their
+    # capture: those are not probed, since a busy device can fail to open, but kept from the
+    # previous result or described from the capture. Results are cached for max_age seconds;
+    # concurrent callers wait for the probe in progress instead of starting another.
+    in_use = in_use or {}
+    with _cache_lock:
+        cached = _cache["cameras"]
+        probing = _cache["probing"]
+        fresh = cached is not None and not refresh and time.monotonic() - _cache["time"] < max_age
+        if not fresh and probing is None:
+            _cache["probing"] = threading.Event()
+    if fresh:
+        return _with_cameras_in_use(cached, in_use, cached)
+    if probing is not None:
+        probing.wait()
+        with _cache_lock:
+            cached = _cache["cameras"] or []
+        return _with_cameras_in_use(cached, in_use, cached)
+
+    cameras = []
+    try:
+        cameras = _probe_cameras([index for index in candidate_indices(max_index) if index not in in_use],
+                                 timeout, modes_timeout)
+    finally:
+        # Waiting callers are released even if probing failed
+        with _cache_lock:
+            previous = _cache["cameras"] or []
+            cameras = _with_cameras_in_use(cameras, in_use, previous)
+            _cache["time"] = time.monotonic()
+            _cache["cameras"] = cameras
+            _cache["probing"].set()
+            _cache["probing"] = None
+    return list(cameras)
+
+
+def _probe_cameras(indices, timeout, modes_timeout):
+    results = {}
+    modes_deadline = time.monotonic() + timeout + modes_timeout
+
+    def probe(index):
+        try:
+            probe_camera(index, found=lambda info: results.__setitem__(index, info), modes_deadline=modes_deadline)
+        except cv2.error:
+            pass
+
+    threads = [threading.Thread(target=probe, args=(index,), name=f"CameraProbe-{index}", daemon=True)
+               for index in indices]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + timeout
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+    listed = list(results)  # Cameras found in time; a late answer does not make the cut
+    for thread in threads:
+        thread.join(max(0.0, modes_deadline - time.monotonic()))
+    return sorted((results[index] for index in listed), key=lambda info: info.index)
+
+
+def _with_cameras_in_use(cameras, in_use, previous):
+    # cameras plus the ones in use, described by their entry in previous if they have one
+    listed = {info.index: info for info in cameras}
+    previous = {info.index: info for info in previous}
+    for index, capture in in_use.items():
+        if index not in listed:
+            listed[index] = previous[index] if index in previous else describe_capture(index, capture)
+    return sorted(listed.values(), key=lambda info: info.index)
+
+
+def configure_capture(capture, width=0, height=0, fps=0, mjpg=True, buffer_size=1):
+    # Request low-latency capture settings; 0 leaves the driver default. MJPG lets USB cameras
+    # deliver higher resolutions and frame rates than raw YUYV over the same bandwidth, and a
+    # one-frame driver buffer keeps the newest frame from queueing behind stale ones.
+    # Drivers ignore what they do not support, so the settings actually in effect are returned.
+    if mjpg:
+        # The V4L2 backend only honors the fourcc when it is set before the resolution
+        capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+    if width and height:
+        capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    if fps:
+        capture.set(cv2.CAP_PROP_FPS, fps)
+    if buffer_size:
+        capture.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+    return (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            capture.get(cv2.CAP_PROP_FPS))
+
+
+def open_camera(index, width=0, height=0, fps=0, mjpg=True, buffer_size=1):
+    # Open and configure a camera; returns None if it cannot be opened. Blocks, so call it off the
+    # GUI thread.
+    capture = cv2.VideoCapture(index)
+    if not capture.isOpened():
+        capture.release()
+        return None
+    configure_capture(capture, width, height, fps, mjpg, buffer_size)
+    return capture
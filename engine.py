@@ -0,0 +1,191 @@
+"""Headless air-writing engine: hand landmarks -> gestures -> drawing events.
+
+AirWritingEngine turns frames or landmarks from any source into typed drawing events (see
+events.py) published on an EventBus, without any Qt dependency. The app is one consumer of these
+events. Run as a script, it captures from a camera and streams the events to every client of a
+local TCP socket, so the recognizer can run on a capture box and the drawing be rendered elsewhere:
+
+    python engine.py --camera 0 --port 8765
+    python app.py --connect 192.168.1.20:8765
+"""
+import argparse
+import time
+
+from events import (Clear, ColorChanged, Erased, EraserSelected, EventBus, EventServer, HandDetected, PointerMoved,
+                    StrokeEnded, StrokePoint, StrokeStarted, Undo)
+from gestures import GestureInterpreter, GestureSink
+from smoothing import add_pointer_filter_arguments, pointer_filter_from_arguments
+from spatial import eraser_radius
+
+
+class AirWritingEngine(GestureSink):
+    # Gesture recognition and drawing state (tool, color, stroke in progress) for one user. The
+    # events of a frame are published together as one batch once it has been processed; actions
+    # coming from elsewhere (e.g. buttons of a GUI) are published right away.
+    def __init__(self, canvas_width=800, canvas_height=600, bus=None, hands=None, color="blue", pointer_filter=None):
+        self.canvas_width = canvas_width  # Canvas the landmarks are mapped to, in pixels
+        self.canvas_height = canvas_height
+        self.bus = bus if bus is not None else EventBus()
+        self.hands = hands  # MediaPipe Hands model used by process_image, if any
+        self.gestures = GestureInterpreter(pointer_filter)  # Optional smoothing.PointerFilter
+        self.color = color
+        self.eraser_active = False  # While active, pinching erases instead of drawing
+        self.stroke = None  # Id of the stroke in progress
+        self.next_stroke = 0
+        self.pending = []  # Events of the frame being processed
+
+    def process_frame(self, hands, frame_width, frame_height, timestamp):
+        # hands is a (hands, 21, 3) landmark array as returned by features.hands_to_array
+        self.gestures.process_frame(hands, frame_width, frame_height, self.canvas_width, self.canvas_height,
+                                    timestamp, self)
+        self.flush()
+
+    def process_image(self, image, timestamp=None):
+        # Run the hand model on a mirrored BGR frame and process the landmarks found
+        import cv2
+        from features import hands_to_array
+        result = self.hands.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        frame_height, frame_width = image.shape[:2]
+        self.process_frame(hands_to_array(result.multi_hand_landmarks), frame_width, frame_height,
+                           time.perf_counter() if timestamp is None else timestamp)
+
+    def flush(self):
+        if self.pending:
+            events = self.pending
+            self.pending = []
+            self.bus.publish(events)
+
+    def select_color(self, color):
+        self.eraser_active = False
+        self.color = color
+        self.pending.append(ColorChanged(color))
+        self.flush()
+
+    def select_eraser(self):
+        self.end_stroke()  # Keep the stroke in progress before erasing
+        self.eraser_active = True
+        self.pending.append(EraserSelected())
+        self.flush()
+
+    def undo(self):
+        self.pending.append(Undo())
+        self.flush()
+
+    def clear_canvas(self):
+        self.clear()
+        self.flush()
+
+    def end_stroke(self):
+        if self.stroke is not None:
+            self.pending.append(StrokeEnded(self.stroke))
+            self.stroke = None
+
+    # GestureSink, called by the GestureInterpreter
+
+    def hand_detected(self, hand_index, writing, thickness):
+        self.pending.append(HandDetected(hand_index, writing, thickness))
+
+    def start_line(self, x, y, thickness):
+        if self.eraser_active:
+            self.pending.append(Erased(x, y, eraser_radius(thickness)))
+            return
+        self.end_stroke()
+        self.stroke = self.next_stroke
+        self.next_stroke += 1
+        self.pending.append(StrokeStarted(self.stroke, x, y, thickness, self.color))
+
+    def add_point(self, x, y, thickness):
+        if self.eraser_active:
+            self.pending.append(Erased(x, y, eraser_radius(thickness)))
+        elif self.stroke is None:
+            self.start_line(x, y, thickness)
+        else:
+            self.pending.append(StrokePoint(self.stroke, x, y, thickness))
+
+    def close_line(self):
+        self.end_stroke()
+
+    def toolbar_action(self, action):
+        if action == "undo":
+            self.pending.append(Undo())
+        elif action == "eraser":
+            self.end_stroke()
+            self.eraser_active = True
+            self.pending.append(EraserSelected())
+        else:
+            self.eraser_active = False
+            self.color = action
+            self.pending.append(ColorChanged(action))
+
+    def pointer_moved(self, x, y, thickness):
+        self.pending.append(PointerMoved(x, y, thickness, "eraser" if self.eraser_active else self.color))
+
+    def clear(self):
+        self.stroke = None  # The stroke in progress is cleared too
+        self.pending.append(Clear())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--camera", type=int, default=0, help="Camera index (default: 0)")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to serve the events on; 0.0.0.0 for every interface (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port to serve the events on (default: 8765)")
+    parser.add_argument("--canvas-width", type=int, default=800, help="Width of the canvas the events are mapped to; match the renderer (default: 800)")
+    parser.add_argument("--canvas-height", type=int, default=600, help="Height of the canvas the events are mapped to (default: 600)")
+    parser.add_argument("--camera-width", type=int, default=640, help="Requested capture width, 0 for the camera default (default: 640)")
+    parser.add_argument("--camera-height", type=int, default=480, help="Requested capture height, 0 for the camera default (default: 480)")
+    parser.add_argument("--camera-fps", type=float, default=30.0, help="Requested capture frame rate, 0 for the camera default (default: 30)")
+    parser.add_argument("--model-complexity", type=int, choices=(0, 1), default=1, help="MediaPipe Hands model complexity, 0 is faster (default: 1)")
+    parser.add_argument("--max-num-hands", type=int, default=2, help="Maximum number of hands MediaPipe looks for (default: 2)")
+    add_pointer_filter_arguments(parser)
+    args = parser.parse_args()
+
+    import mediapipe as mp
+
+    from cameras import open_camera
+    from pipeline import FramePipeline
+
+    video_capture = open_camera(args.camera, args.camera_width, args.camera_height, args.camera_fps)
+    if video_capture is None:
+        print(f"Error: Cannot open camera {args.camera}")
+        return
+    hands = mp.solutions.hands.Hands(model_complexity=args.model_complexity, max_num_hands=args.max_num_hands)
+    pointer_filter = pointer_filter_from_arguments(args)
+    engine = AirWritingEngine(args.canvas_width, args.canvas_height, pointer_filter=pointer_filter)
+    server = EventServer(engine.bus, args.host, args.port)
+    if not server.start():
+        video_capture.release()
+        return
+    print(f"Serving drawing events on {server.host}:{server.port}, Ctrl+C to stop")
+
+    pipeline = FramePipeline(video_capture, hands)
+    pipeline.start()
+    frames = 0
+    start = time.perf_counter()
+    try:
+        while True:
+            # Every processed frame, so strokes keep all of their points
+            packet = pipeline.processed_frames.get(timeout=0.5)
+            if packet is None or not packet.ok:
+                continue
+            frame_height, frame_width = packet.frame.shape[:2]
+            if pointer_filter is not None:
+                pointer_filter.observe_latency(time.perf_counter() - packet.timestamp)
+            if len(packet.hands):
+                engine.process_frame(packet.hands, frame_width, frame_height, packet.timestamp)
+            packet.release()
+            frames += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.stop()
+        video_capture.release()
+        hands.close()
+        server.stop()
+    elapsed = time.perf_counter() - start
+    print(f"{frames} frames in {elapsed:.1f} s ({frames / elapsed:.1f} FPS), {engine.bus.events_published} events "
+          f"in {engine.bus.batches_published} batches")
+
+
+if __name__ == "__main__":
+    main()
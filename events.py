@@ -0,0 +1,353 @@
+import asyncio
+import json
+import socket
+import threading
+
+# Drawing events emitted by the AirWritingEngine. Coordinates are canvas pixels of the engine,
+# colors are toolbar color names ("blue", "red", "green").
+
+
+class Event:
+    kind = None
+    __slots__ = ()
+
+    def to_dict(self):
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields["type"] = self.kind
+        return fields
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__))
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+
+class PointerMoved(Event):
+    kind = "pointer"
+    __slots__ = ("x", "y", "thickness", "color")
+
+    def __init__(self, x, y, thickness, color):
+        self.x = x
+        self.y = y
+        self.thickness = thickness
+        self.color = color  # Color of the pointer, "eraser" while erasing
+
+
+class HandDetected(Event):
+    kind = "hand"
+    __slots__ = ("hand", "writing", "thickness")
+
+    def __init__(self, hand, writing, thickness):
+        self.hand = hand  # Index of the hand in the landmarks of the frame
+        self.writing = writing  # Thumb and index are pinched
+        self.thickness = thickness
+
+
+class StrokeStarted(Event):
+    kind = "stroke_start"
+    __slots__ = ("stroke", "x", "y", "thickness", "color")
+
+    def __init__(self, stroke, x, y, thickness, color):
+        self.stroke = stroke  # Stroke id, increasing over the life of the engine
+        self.x = x
+        self.y = y
+        self.thickness = thickness
+        self.color = color
+
+
+class StrokePoint(Event):
+    kind = "stroke_point"
+    __slots__ = ("stroke", "x", "y", "thickness")
+
+    def __init__(self, stroke, x, y, thickness):
+        self.stroke = stroke
+        self.x = x
+        self.y = y
+        self.thickness = thickness
+
+
+class StrokeEnded(Event):
+    kind = "stroke_end"
+    __slots__ = ("stroke",)
+
+    def __init__(self, stroke):
+        self.stroke = stroke
+
+
+class Erased(Event):
+    kind = "erase"
+    __slots__ = ("x", "y", "radius")
+
+    def __init__(self, x, y, radius):
+        self.x = x
+        self.y = y
+        self.radius = radius
+
+
+class ColorChanged(Event):
+    kind = "color"
+    __slots__ = ("color",)
+
+    def __init__(self, color):
+        self.color = color
+
+
+class EraserSelected(Event):
+    kind = "eraser"
+    __slots__ = ()
+
+
+class Undo(Event):
+    kind = "undo"
+    __slots__ = ()
+
+
+class Clear(Event):
+    kind = "clear"
+    __slots__ = ()
+
+
+EVENT_TYPES = {event_type.kind: event_type for event_type in
+               (PointerMoved, HandDetected, StrokeStarted, StrokePoint, StrokeEnded, Erased, ColorChanged,
+                EraserSelected, Undo, Clear)}
+
+
+def event_from_dict(fields):
+    fields = dict(fields)
+    return EVENT_TYPES[fields.pop("type")](**fields)
+
+
+def encode_batch(events):
+    # One batch as a line of JSON, the wire format of EventServer
+    return (json.dumps([event.to_dict() for event in events], separators=(",", ":")) + "\n").encode()
+
+
+def decode_batch(line):
+    return [event_from_dict(fields) for fields in json.loads(line)]
+
+
+def latest_key(event):
+    # Key under which only the newest pending event is delivered, None for events that all count
+    event_type = type(event)
+    if event_type is PointerMoved:
+        return "pointer"
+    if event_type is HandDetected:
+        return "hand", event.hand
+    return None
+
+
+class Subscription:
+    # Events published since the subscriber last looked, handed over as one batch however many
+    # frames they came from, in publish order. Only the newest pending PointerMoved, and the newest
+    # HandDetected of each hand, are kept, since they replace the earlier states anyway; stroke
+    # events are never dropped. A subscriber that stops reading
+    # is cut off once max_pending events are waiting, rather than growing without bound.
+    def __init__(self, bus, max_pending=10000):
+        self.bus = bus
+        self.max_pending = max_pending
+        self.pending = []
+        self.latest = {}  # Coalescing key -> position in pending of the newest such event, see latest_key
+        self.lock = threading.Lock()
+        self.available = threading.Condition(self.lock)
+        self.closed = False
+        self.overflowed = False
+        self.coalesced = 0  # PointerMoved and HandDetected events replaced by a newer one before being read
+        self.loop = None  # Event loop of an asyncio subscriber, see next_batch
+        self.async_available = None
+
+    def put(self, events):
+        with self.lock:
+            if self.closed:
+                return
+            for event in events:
+                key = latest_key(event)
+                if key is not None:
+                    position = self.latest.get(key)
+                    if position is not None:
+                        # Drop the old state; the new one goes at the end, after the events
+                        # published in between
+                        del self.pending[position]
+                        for other, other_position in self.latest.items():
+                            if other_position > position:
+                                self.latest[other] = other_position - 1
+                        self.coalesced += 1
+                    self.latest[key] = len(self.pending)
+                self.pending.append(event)
+            if len(self.pending) > self.max_pending:
+                self.overflowed = True
+                self.closed = True
+            self.available.notify_all()
+            loop = self.loop
+        if loop is not None and not self.wake(loop):
+            self.close()  # The event loop of the subscriber is gone
+
+    def wake(self, loop):
+        # Wake next_batch from another thread; False if its event loop has been closed
+        try:
+            loop.call_soon_threadsafe(self.async_available.set)
+        except RuntimeError:
+            return False
+        return True
+
+    def get_batch(self, timeout=0):
+        # Every pending event, oldest first; waits up to timeout seconds (None: forever) for one
+        with self.lock:
+            if not self.pending and timeout != 0 and not self.closed:
+                self.available.wait(timeout)
+            batch = self.pending
+            self.pending = []
+            self.latest = {}
+            return batch
+
+    async def next_batch(self):
+        # asyncio counterpart of get_batch(None); returns an empty batch once closed
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+            self.async_available = asyncio.Event()
+        while True:
+            self.async_available.clear()
+            batch = self.get_batch()
+            if batch or self.closed:
+                return batch
+            await self.async_available.wait()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        batch = await self.next_batch()
+        if not batch:
+            raise StopAsyncIteration
+        return batch
+
+    def close(self):
+        self.bus.unsubscribe(self)
+        with self.lock:
+            self.closed = True
+            self.available.notify_all()
+            loop = self.loop
+        if loop is not None:
+            self.wake(loop)
+
+
+class EventBus:
+    # Fans batches of events out to any number of subscribers; publish never blocks on them
+    def __init__(self):
+        self.subscriptions = []
+        self.lock = threading.Lock()
+        self.batches_published = 0
+        self.events_published = 0
+
+    def subscribe(self, max_pending=10000):
+        subscription = Subscription(self, max_pending)
+        with self.lock:
+            self.subscriptions = self.subscriptions + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions = [other for other in self.subscriptions if other is not subscription]
+
+    def publish(self, events):
+        if not events:
+            return
+        self.batches_published += 1
+        self.events_published += len(events)
+        for subscription in self.subscriptions:
+            subscription.put(events)
+            if subscription.overflowed:
+                print("Error: An event subscriber fell too far behind and was disconnected")
+                self.unsubscribe(subscription)
+
+
+class EventServer(threading.Thread):
+    # Streams the batches of a bus to every client connected to a TCP socket, one JSON line per
+    # batch (see encode_batch). Runs its own asyncio loop in a background thread.
+    def __init__(self, bus, host="127.0.0.1", port=8765):
+        super().__init__(name="EventServer", daemon=True)
+        self.bus = bus
+        self.host = host
+        self.port = port
+        self.clients = 0
+        self.subscriptions = set()
+        self.loop = None
+        self.server = None
+        self.started = threading.Event()
+        self.error = None
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.server = self.loop.run_until_complete(asyncio.start_server(self.serve_client, self.host, self.port))
+        except OSError as error:
+            self.error = error
+            self.started.set()
+            return
+        self.port = self.server.sockets[0].getsockname()[1]  # The actual port when 0 was asked for
+        self.started.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.server.close()
+            self.loop.run_until_complete(self.server.wait_closed())
+            self.loop.close()
+
+    def start(self):
+        # Start serving; returns False (and prints why) if the socket cannot be opened
+        super().start()
+        self.started.wait()
+        if self.error is not None:
+            print(f"Error: Cannot serve events on {self.host}:{self.port}: {self.error}")
+            return False
+        return True
+
+    async def serve_client(self, reader, writer):
+        subscription = self.bus.subscribe()
+        self.subscriptions.add(subscription)
+        self.clients += 1
+        # Batches are small and latency matters more than packet count
+        writer.get_extra_info("socket").setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            async for batch in subscription:
+                writer.write(encode_batch(batch))
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.clients -= 1
+            self.subscriptions.discard(subscription)
+            subscription.close()
+            writer.close()
+
+    def stop(self):
+        if self.loop is not None and self.is_alive():
+            for subscription in list(self.subscriptions):
+                subscription.close()  # Ends the client handlers
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.join()
+
+
+def read_batches(host, port):
+    # Blocking client of EventServer: yields the batches as they arrive until the server goes away
+    with socket.create_connection((host, port)) as connection:
+        with connection.makefile("rb") as stream:
+            for line in stream:
+                yield decode_batch(line)
+
+
+def relay_events(host, port, bus):
+    # Republish the batches of a remote EventServer on a local bus until the connection ends
+    try:
+        for batch in read_batches(host, port):
+            bus.publish(batch)
+    except OSError as error:
+        print(f"Error: Cannot receive events from {host}:{port}: {error}")
+        return
+    print(f"Event stream from {host}:{port} ended")
+
+
+def parse_address(text, default_host="127.0.0.1"):
+    # "HOST:PORT" or "PORT" as (host, port)
+    host, _, port = text.rpartition(":")
+    return host or default_host, int(port)
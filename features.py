@@ -0,0 +1,100 @@
+import numpy as np
+
+NUM_LANDMARKS = 21  # MediaPipe Hands landmarks per hand
+
+THUMB_TIP = 4
+INDEX_TIP = 8
+
+# Landmark pairs whose spacing approximates how close the hand is to the camera
+KNUCKLE_PAIRS = tuple((i, i + 1) for i in range(0, 20, 4))
+# Knuckle -> point between the middle and proximal phalanx of each finger, short for a closed fist
+FIST_PAIRS = tuple((i, i + 2) for i in range(5, 18, 4))
+
+# Same skeleton as mp.solutions.hands.HAND_CONNECTIONS
+HAND_CONNECTIONS = (
+    (0, 1), (1, 2), (2, 3), (3, 4),
+    (0, 5), (5, 6), (6, 7), (7, 8),
+    (5, 9), (9, 10), (10, 11), (11, 12),
+    (9, 13), (13, 14), (14, 15), (15, 16),
+    (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),
+)
+CONNECTION_COLOR = (224, 224, 224)  # MediaPipe's default connection and landmark border color
+
+
+def landmarks_to_array(hand_landmark):
+    # Convert one MediaPipe NormalizedLandmarkList into a (21, 3) array of normalized x, y, z
+    return np.array([(landmark.x, landmark.y, landmark.z) for landmark in hand_landmark.landmark], dtype=np.float64)
+
+
+def hands_to_array(multi_hand_landmarks):
+    # Stack every detected hand of a frame into a (hands, 21, 3) array
+    if not multi_hand_landmarks:
+        return np.empty((0, NUM_LANDMARKS, 3), dtype=np.float64)
+    return np.stack([landmarks_to_array(hand_landmark) for hand_landmark in multi_hand_landmarks])
+
+
+class HandFeatures:
+    # Gesture features for a batch of hands; every field has the batch shape of the input landmarks
+    __slots__ = ("knuckle_distance", "pinch_distance", "cx", "cy", "fist_distance")
+
+    def __init__(self, knuckle_distance, pinch_distance, cx, cy, fist_distance):
+        self.knuckle_distance = knuckle_distance  # Average knuckle spacing in pixels
+        self.pinch_distance = pinch_distance  # Thumb tip to index tip distance in pixels
+        self.cx = cx  # Pinch midpoint in frame pixels
+        self.cy = cy
+        self.fist_distance = fist_distance  # Average knuckle to phalanx distance in pixels
+
+
+def _pair_distances(points, pairs, frame_width):
+    # Distances are scaled by half the frame width on both axes, like the original per-landmark formulas
+    first = points[..., [i for i, _ in pairs], :]
+    second = points[..., [j for _, j in pairs], :]
+    return np.sqrt((first[..., 0] - second[..., 0]) ** 2 + (first[..., 1] - second[..., 1]) ** 2) * frame_width / 2
+
+
+def _average(values):
+    # Sum left to right and divide, matching sum(list) / len(list) bit for bit
+    total = values[..., 0]
+    for k in range(1, values.shape[-1]):
+        total = total + values[..., k]
+    return total / values.shape[-1]
+
+
+def extract_features(points, frame_width, frame_height):
+    # points has shape (..., 21, 2 or 3) with normalized coordinates, so a single hand, the hands of
+    # one frame or a whole recorded stream of frames are all handled in one vectorized pass
+    points = np.asarray(points, dtype=np.float64)
+    thumb_tip = points[..., THUMB_TIP, :]
+    index_tip = points[..., INDEX_TIP, :]
+
+    knuckle_distance = _average(_pair_distances(points, KNUCKLE_PAIRS, frame_width))
+    pinch_distance = _pair_distances(points, ((THUMB_TIP, INDEX_TIP),), frame_width)[..., 0]
+    fist_distance = _average(_pair_distances(points, FIST_PAIRS, frame_width))
+
+    # Average position between the tip of the thumb and index, truncated like int()
+    cx = ((thumb_tip[..., 0] + index_tip[..., 0]) * frame_width / 2).astype(np.int64)
+    cy = ((thumb_tip[..., 1] + index_tip[..., 1]) * frame_height / 2).astype(np.int64)
+
+    return HandFeatures(knuckle_distance, pinch_distance, cx, cy, fist_distance)
+
+
+def draw_landmarks(image, points, color, thickness, circle_radius=4, connections=HAND_CONNECTIONS):
+    # Draw one hand from a (21, 2 or 3) landmark array, matching the look of
+    # mp.solutions.drawing_utils.draw_landmarks, so tracked hands can be drawn too. OpenCV is
+    # imported on first use, so the gesture logic can be imported without it.
+    import cv2
+    image_height, image_width = image.shape[:2]
+    xs = np.minimum(np.floor(points[:, 0] * image_width), image_width - 1).astype(int).tolist()
+    ys = np.minimum(np.floor(points[:, 1] * image_height), image_height - 1).astype(int).tolist()
+    # Landmarks outside the image are not drawn
+    visible = (points[:, 0] >= 0) & (points[:, 0] <= 1) & (points[:, 1] >= 0) & (points[:, 1] <= 1)
+
+    for start, end in connections:
+        if visible[start] and visible[end]:
+            cv2.line(image, (xs[start], ys[start]), (xs[end], ys[end]), CONNECTION_COLOR, 2)
+
+    border_radius = max(circle_radius + 1, int(circle_radius * 1.2))
+    for i in np.flatnonzero(visible):
+        center = (xs[i], ys[i])
+        cv2.circle(image, center, border_radius, CONNECTION_COLOR, thickness)
+        cv2.circle(image, center, circle_radius, color, thickness)
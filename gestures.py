@@ -0,0 +1,158 @@
+from features import INDEX_TIP, THUMB_TIP, extract_features
+
+# Pinching above the drawing area selects the toolbar entry under the pointer (canvas x ranges).
+# These are the five buttons of the app at its default size; the app replaces them with the
+# geometry of its buttons (see GestureInterpreter.toolbar_zones), so a zone never reaches into
+# the neighboring button.
+TOOLBAR_ZONES = (
+    (11, 159, "blue"),
+    (165, 314, "red"),
+    (320, 468, "green"),
+    (474, 623, "undo"),
+    (629, 777, "eraser"),
+)
+TOOLBAR_BOTTOM = 100  # Pointer y below which the toolbar is active
+DRAWING_AREA_TOP = 120  # Pointer y from which pinching draws
+
+
+class GestureSink:
+    # Receives the actions recognized by GestureInterpreter. The Qt window forwards them to the
+    # DrawingCanvas, headless tools record them; every method is optional.
+    def hand_detected(self, hand_index, writing, thickness):
+        pass
+
+    def start_line(self, x, y, thickness):
+        pass
+
+    def add_point(self, x, y, thickness):
+        pass
+
+    def close_line(self):
+        pass
+
+    def toolbar_action(self, action):
+        # action is one of the toolbar zone names: a color, "undo" or "eraser"
+        pass
+
+    def pointer_moved(self, x, y, thickness):
+        pass
+
+    def clear(self):
+        pass
+
+
+class GestureInterpreter:
+    # Turns hand landmarks into drawing actions. Qt-free so the same logic drives the app,
+    # the headless replay harness and offline analysis. An optional smoothing.PointerFilter
+    # smooths the pinch point; strokes and the toolbar use the smoothed position, the pointer the
+    # position predicted ahead by the pipeline latency.
+    def __init__(self, pointer_filter=None):
+        self.distance_costant = 70
+        self.new_line = False
+
+        self.punch_treshold = 20
+
+        self.max_hand_distance = 160  # Maximum distance of the hand from the camera
+        self.min_hand_distance = 20  # Minimum distance of the hand from the camera
+        self.max_stroke_thickness = 15  # Maximum stroke thickness
+        self.min_stroke_thickness = 1  # Minimum stroke thickness
+
+        self.undo_interval = 0.3  # Seconds between two undos triggered by holding a pinch over UNDO
+        self.last_undo_time = None
+
+        self.pointer_filter = pointer_filter
+        self.toolbar_zones = TOOLBAR_ZONES  # (left, right, action) in canvas x
+
+    def map_distance_to_thickness(self, distance):
+        # Map the hand distance to the stroke thickness
+
+        # Ensure that normalized_distance is between 0 and 1
+        normalized_distance = max(0, min(1, distance))
+
+        # Linearly map the normalized distance to a stroke thickness
+        thickness_range = self.max_stroke_thickness - self.min_stroke_thickness
+        thickness = self.min_stroke_thickness + normalized_distance * thickness_range
+
+        return thickness
+
+    def process_frame(self, hands, frame_width, frame_height, canvas_width, canvas_height, timestamp, sink):
+        # hands is a (hands, 21, 3) landmark array as returned by features.hands_to_array
+        if len(hands) == 0:
+            return
+        features = extract_features(hands, frame_width, frame_height)
+        filtered = [None] * len(hands)
+        if self.pointer_filter is not None:
+            # The filter gets the exact pinch midpoints, not the ones truncated to frame pixels, of
+            # every hand at once so it can tell which hand is which
+            pinch = (hands[:, THUMB_TIP, :2] + hands[:, INDEX_TIP, :2]) / 2 * (canvas_width, canvas_height)
+            filtered = self.pointer_filter.filter_hands(pinch.tolist(), timestamp)
+        for h in range(len(hands)):
+            self.process_hand(features, h, frame_width, frame_height, canvas_width, canvas_height, timestamp, sink,
+                              filtered[h])
+
+    def process_hand(self, features, h, frame_width, frame_height, canvas_width, canvas_height, timestamp, sink,
+                     filtered=None):
+        # Convert average knuckle distance to distance from camera (approximation)
+        hand_distance = float(features.knuckle_distance[h] - self.min_hand_distance) / (self.max_hand_distance - self.min_hand_distance)
+
+        # Convert hand distance to stroke thickness
+        stroke_thickness = self.map_distance_to_thickness(hand_distance)
+
+        # Distance between the tip of the thumb and index
+        distance = float(features.pinch_distance[h])
+
+        # Set the maximum writing distance based on the hand distance from the screen
+        max_writing_distance = (hand_distance) * self.distance_costant
+        writing = distance < max_writing_distance
+        sink.hand_detected(h, writing, stroke_thickness)
+
+        # Average position between the tip of the thumb and index
+        cx = int(features.cx[h])
+        cy = int(features.cy[h])
+
+        # Convert coordinates to be on the right side of the application
+        cx_canvas = int(cx * canvas_width / frame_width)
+        cy_canvas = int(cy * canvas_height / frame_height)
+        pointer_x, pointer_y = cx_canvas, cy_canvas
+        if filtered is not None:
+            x, y, predicted_x, predicted_y = filtered
+            cx_canvas, cy_canvas = int(round(x)), int(round(y))
+            pointer_x, pointer_y = int(round(predicted_x)), int(round(predicted_y))
+
+        if cy_canvas > DRAWING_AREA_TOP:
+            # Add the point to the drawing canvas with the calculated thickness
+            if writing:
+                if not self.new_line:
+                    sink.add_point(cx_canvas, cy_canvas, stroke_thickness)
+                else:
+                    sink.start_line(cx_canvas, cy_canvas, stroke_thickness)
+                    self.new_line = False  # Set the flag to False to continue the existing stroke
+            else:
+                if not self.new_line:
+                    sink.close_line()
+                self.new_line = True  # Set the flag to True to start a new stroke
+        elif cy_canvas < TOOLBAR_BOTTOM:
+            if not self.new_line:
+                sink.close_line()
+            self.new_line = True  # Set the flag to True to start a new stroke
+
+            if writing:
+                for left, right, action in self.toolbar_zones:
+                    if left < cx_canvas < right:
+                        if action != "undo" or self.undo_ready(timestamp):
+                            sink.toolbar_action(action)
+                        break
+
+        # Update the pointer with the average position
+        sink.pointer_moved(pointer_x, pointer_y, stroke_thickness)
+
+        # If the average knuckle to phalanx distance is below a certain threshold, consider the hand as a closed fist
+        if features.fist_distance[h] < self.punch_treshold:
+            sink.clear()
+
+    def undo_ready(self, timestamp):
+        # Holding the pinch over UNDO repeats the undo at most once per undo_interval
+        if self.last_undo_time is not None and timestamp - self.last_undo_time < self.undo_interval:
+            return False
+        self.last_undo_time = timestamp
+        return True
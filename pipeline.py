@@ -0,0 +1,258 @@
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from features import hands_to_array
+from profiling import StageProfiler
+from tracking import LandmarkTracker
+
+
+class LatestQueue:
+    # Bounded queue that only keeps the newest items: putting into a full queue
+    # discards the oldest entry instead of blocking the producer
+    def __init__(self, maxsize=1, discard=None):
+        self._items = deque(maxlen=maxsize)
+        self._condition = threading.Condition()
+        self.discard = discard  # Called with every item dropped without being consumed, or None
+        self.dropped = 0  # Number of stale items discarded so far
+
+    def put(self, item):
+        with self._condition:
+            stale = None
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+                stale = self._items.popleft()
+            self._items.append(item)
+            self._condition.notify()
+        if stale is not None and self.discard is not None:
+            self.discard(stale)
+
+    def get(self, timeout=None):
+        # Wait for an item; only the worker threads call this, never the GUI thread
+        with self._condition:
+            if not self._items:
+                self._condition.wait(timeout)
+            return self._items.popleft() if self._items else None
+
+    def get_nowait(self):
+        with self._condition:
+            return self._items.popleft() if self._items else None
+
+    def clear(self):
+        with self._condition:
+            items = list(self._items)
+            self._items.clear()
+        if self.discard is not None:
+            for item in items:
+                self.discard(item)
+
+
+class FrameBufferPool:
+    # Free list of frame buffers, so steady-state capture does not allocate a new frame per read.
+    # A buffer is only handed out again after release(): the packet holding it was dropped by a
+    # LatestQueue or its consumer is done with it. Buffers that are never released are simply
+    # garbage collected, and at most `size` free buffers are kept.
+    def __init__(self, size=6):
+        self.size = size
+        self.free = []
+        self._lock = threading.Lock()
+
+    def acquire(self, shape, dtype=np.uint8):
+        with self._lock:
+            while self.free:
+                buffer = self.free.pop()
+                if buffer.shape == shape and buffer.dtype == dtype:
+                    return buffer
+        return np.empty(shape, dtype=dtype)
+
+    def release(self, buffer):
+        with self._lock:
+            if len(self.free) < self.size:
+                self.free.append(buffer)
+
+
+class FramePacket:
+    # A captured frame travelling through the pipeline together with its inference result
+    __slots__ = ("index", "timestamp", "ok", "frame", "rgb", "hands", "detected", "leases")
+
+    def __init__(self, index, timestamp, ok, frame=None):
+        self.index = index
+        self.timestamp = timestamp  # time.perf_counter() right after the frame was read
+        self.ok = ok  # False if the camera failed to deliver a frame
+        self.frame = frame  # Mirrored BGR frame
+        self.rgb = None  # Full-frame RGB conversion, if inference made one the display can reuse
+        self.hands = None  # (hands, 21, 3) normalized landmarks, filled by the inference worker
+        self.detected = False  # True if the landmarks come from the model rather than the tracker
+        self.leases = []  # (pool, buffer) pairs to hand back on release()
+
+    def release(self):
+        # The pixels are no longer needed: return the pooled buffers so the workers can reuse them.
+        # The frame and its RGB conversion are gone afterwards; the landmarks stay.
+        for pool, buffer in self.leases:
+            pool.release(buffer)
+        self.leases = []
+        self.frame = None
+        self.rgb = None
+
+
+class CaptureWorker(threading.Thread):
+    # Reads frames from the camera as fast as it delivers them and mirrors them
+    def __init__(self, video_capture, output_queue, profiler):
+        super().__init__(name="CaptureWorker", daemon=True)
+        self.video_capture = video_capture
+        self.output_queue = output_queue
+        self.profiler = profiler
+        self.buffers = FrameBufferPool()
+        self.raw_frame = None  # Read buffer, reused by every read once the camera delivered a frame
+        self._stop_event = threading.Event()
+
+    def run(self):
+        index = 0
+        while not self._stop_event.is_set():
+            with self.profiler.stage("capture_read"):
+                ret, frame = self.video_capture.read(self.raw_frame)
+            timestamp = time.perf_counter()
+            if not ret:
+                self.output_queue.put(FramePacket(index, timestamp, False))
+                # Avoid spinning on a camera that keeps failing
+                self._stop_event.wait(0.05)
+                continue
+
+            self.raw_frame = frame
+
+            # Flip the frame horizontally (mirror effect) into a pooled buffer
+            with self.profiler.stage("flip"):
+                frame = cv2.flip(frame, 1, dst=self.buffers.acquire(frame.shape))
+            packet = FramePacket(index, timestamp, True, frame)
+            packet.leases.append((self.buffers, frame))
+            self.output_queue.put(packet)
+            index += 1
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class InferenceWorker(threading.Thread):
+    # Runs MediaPipe Hands on the newest captured frame, skipping frames it could not keep up with.
+    # With a scheduler, the model only runs every scheduler.interval frames and the tracker
+    # carries the landmarks forward in between.
+    def __init__(self, hands, input_queue, output_queue, profiler, scheduler=None, region=None):
+        super().__init__(name="InferenceWorker", daemon=True)
+        self.hands = hands
+        self.region = region  # RegionOfInterest to run the model on a crop around the last hand, or None
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.profiler = profiler
+        self.scheduler = scheduler
+        self.tracker = LandmarkTracker() if scheduler is not None else None
+        self.rgb_buffers = FrameBufferPool()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            packet = self.input_queue.get(timeout=0.1)
+            if packet is None:
+                continue
+            if packet.ok:
+                if self.scheduler is None:
+                    packet.hands, _ = self.detect(packet)
+                    packet.detected = True
+                else:
+                    self.detect_or_track(packet)
+            self.output_queue.put(packet)
+
+    def detect(self, packet):
+        # Process the frame with MediaPipe Hands, returning full-frame landmarks and handedness scores
+        frame = packet.frame
+        frame_height, frame_width = frame.shape[:2]
+        if self.region is not None and self.region.box is not None:
+            with self.profiler.stage("roi_crop"):
+                crop = self.region.crop(frame)
+            hands, scores = self.process(crop)
+            if len(hands):
+                hands = self.region.to_frame(hands, frame_width, frame_height)
+                self.region.update(hands, frame_width, frame_height)
+                return hands, scores
+            # The hand left the region: fall back to searching the whole frame
+            self.region.box = None
+
+        # The full-frame RGB conversion is kept on the packet so the display does not convert again
+        packet.rgb = self.rgb_buffers.acquire(frame.shape)
+        packet.leases.append((self.rgb_buffers, packet.rgb))
+        hands, scores = self.process(frame, packet.rgb)
+        if self.region is not None:
+            self.region.update(hands, frame_width, frame_height)
+        return hands, scores
+
+    def process(self, frame, rgb_frame=None):
+        with self.profiler.stage("cvt_color_inference"):
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb_frame)
+        with self.profiler.stage("hands_process"):
+            result = self.hands.process(rgb_frame)
+        scores = [handedness.classification[0].score for handedness in result.multi_handedness or ()]
+        return hands_to_array(result.multi_hand_landmarks), scores
+
+    def detect_or_track(self, packet):
+        start = time.perf_counter()
+        with self.profiler.stage("track"):
+            gray = self.tracker.prepare(packet.frame)
+            hands = None
+            if not self.scheduler.should_detect(self.tracker.active):
+                hands = self.tracker.track(gray)
+        if hands is not None:
+            self.scheduler.tracked(time.perf_counter() - start)
+            if self.region is not None:
+                # Keep the crop for the next detection centered on the tracked hand
+                frame_height, frame_width = packet.frame.shape[:2]
+                self.region.update(hands, frame_width, frame_height)
+            packet.hands = hands
+            return
+
+        # Tracking was not due or lost the hand: run the full model on this frame
+        start = time.perf_counter()
+        hands, scores = self.detect(packet)
+        self.scheduler.detected(time.perf_counter() - start, scores)
+        self.tracker.reset(gray, hands)
+        packet.hands = hands
+        packet.detected = True
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class FramePipeline:
+    # Capture -> inference -> consumer pipeline. The consumer (the GUI thread) polls
+    # latest() which never blocks and only ever returns the newest processed frame, and calls
+    # packet.release() once it has copied the pixels out; frames dropped on the way are released
+    # by the queues.
+    def __init__(self, video_capture, hands, profiler=None, scheduler=None, region=None):
+        self.video_capture = video_capture
+        self.profiler = profiler if profiler is not None else StageProfiler()
+        self.scheduler = scheduler  # InferenceScheduler for the adaptive inference rate, None to detect every frame
+        self.captured_frames = LatestQueue(discard=FramePacket.release)
+        self.processed_frames = LatestQueue(discard=FramePacket.release)
+        self.capture_worker = CaptureWorker(video_capture, self.captured_frames, self.profiler)
+        self.inference_worker = InferenceWorker(hands, self.captured_frames, self.processed_frames, self.profiler,
+                                                scheduler, region)
+
+    def start(self):
+        self.capture_worker.start()
+        self.inference_worker.start()
+
+    def stop(self):
+        self.capture_worker.stop()
+        self.inference_worker.stop()
+        self.capture_worker.join(timeout=1.0)
+        self.inference_worker.join(timeout=1.0)
+        self.captured_frames.clear()
+        self.processed_frames.clear()
+
+    def latest(self):
+        return self.processed_frames.get_nowait()
+
+    @property
+    def dropped_frames(self):
+        return self.captured_frames.dropped + self.processed_frames.dropped
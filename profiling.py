@@ -0,0 +1,118 @@
+import csv
+import json
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class _NullStage:
+    # Shared no-op context manager handed out while profiling is disabled
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class StageProfiler:
+    # Rolling per-stage timings, capture-to-paint latency and display rate. Stages are timed from any
+    # thread with `with profiler.stage("name"):`; while disabled that costs one attribute check.
+    def __init__(self, window=240, enabled=False):
+        self.window = window  # Number of samples kept per stage
+        self.enabled = enabled
+        self.stages = {}
+        self.latencies = deque(maxlen=window)
+        self.frame_times = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        samples = self.stages.get(name)
+        if samples is None:
+            with self._lock:
+                samples = self.stages.setdefault(name, deque(maxlen=self.window))
+        samples.append(seconds)
+
+    def record_latency(self, capture_time):
+        # Called when a frame captured at capture_time (perf_counter) has been painted
+        if self.enabled:
+            now = time.perf_counter()
+            self.latencies.append(now - capture_time)
+            self.frame_times.append(now)
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+        self.latencies.clear()
+        self.frame_times.clear()
+
+    def fps(self):
+        frame_times = list(self.frame_times)
+        if len(frame_times) < 2 or frame_times[-1] == frame_times[0]:
+            return 0.0
+        return (len(frame_times) - 1) / (frame_times[-1] - frame_times[0])
+
+    @staticmethod
+    def _statistics(samples):
+        values = np.array(samples) * 1000
+        p50, p95 = np.percentile(values, [50, 95])
+        return {"count": len(values), "mean_ms": float(values.mean()), "p50_ms": float(p50),
+                "p95_ms": float(p95), "max_ms": float(values.max())}
+
+    def summary(self):
+        # Per-stage statistics in milliseconds, plus the end-to-end latency and the display rate
+        with self._lock:
+            stages = {name: list(samples) for name, samples in self.stages.items()}
+        summary = {name: self._statistics(samples) for name, samples in stages.items() if samples}
+        latencies = list(self.latencies)
+        if latencies:
+            summary["capture_to_paint"] = self._statistics(latencies)
+        return summary
+
+    def overlay_text(self):
+        summary = self.summary()
+        text = f"FPS {self.fps():.1f}"
+        if "capture_to_paint" in summary:
+            text += f" | latency {summary['capture_to_paint']['mean_ms']:.1f} ms"
+        if "hands_process" in summary:
+            text += f" | inference {summary['hands_process']['mean_ms']:.1f} ms"
+        return text
+
+    def export(self, path):
+        # Write the current summary as .json or, for any other extension, as CSV
+        summary = self.summary()
+        if path.endswith(".json"):
+            with open(path, "w") as f:
+                json.dump({"fps": self.fps(), "stages": summary}, f, indent=2)
+        else:
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["stage", "count", "mean_ms", "p50_ms", "p95_ms", "max_ms"])
+                for name, stats in summary.items():
+                    writer.writerow([name, stats["count"], f"{stats['mean_ms']:.3f}", f"{stats['p50_ms']:.3f}",
+                                     f"{stats['p95_ms']:.3f}", f"{stats['max_ms']:.3f}"])
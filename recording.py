@@ -0,0 +1,198 @@
+import threading
+
+import cv2
+import numpy as np
+
+from profiling import StageProfiler
+
+# What RecordingRing does with a frame submitted while every slot is waiting for the encoder:
+# "oldest" overwrites the oldest queued frame, keeping the video closest to live; "newest" drops
+# the submitted frame, keeping the queued ones
+DROP_POLICIES = ("oldest", "newest")
+
+
+class RecordingSlot:
+    # One frame of the ring: the annotated camera frame and the canvas, copied into buffers owned by
+    # the slot so the GUI can reuse its own right away
+    __slots__ = ("video", "canvas", "timestamp")
+
+    def __init__(self):
+        self.video = None  # RGB
+        self.canvas = None  # BGRA, as QImage.Format_RGB32 lays it out
+        self.timestamp = None
+
+    @staticmethod
+    def _copy(buffer, source):
+        if buffer is None or buffer.shape != source.shape or buffer.dtype != source.dtype:
+            return source.copy()
+        np.copyto(buffer, source)
+        return buffer
+
+    def fill(self, video, canvas, timestamp):
+        self.video = self._copy(self.video, video)
+        self.canvas = self._copy(self.canvas, canvas)
+        self.timestamp = timestamp
+
+
+class RecordingRing:
+    # Bounded ring of preallocated slots between the GUI thread and the encoder. put() never waits;
+    # when the ring is full it drops a frame according to drop_policy. The encoder swaps the slot it
+    # takes for the one it has finished with, so no buffer is written while it is being encoded.
+    def __init__(self, size=8, drop_policy="oldest"):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy {drop_policy!r}, expected one of {', '.join(DROP_POLICIES)}")
+        self.slots = [RecordingSlot() for _ in range(size)]
+        self.spare = RecordingSlot()  # Slot held by the encoder
+        self.drop_policy = drop_policy
+        self.head = 0  # Oldest queued slot
+        self.count = 0
+        self.dropped = 0
+        self.closed = False
+        self._condition = threading.Condition()
+
+    def put(self, video, canvas, timestamp):
+        # Queue a frame; returns False if it was dropped
+        with self._condition:
+            if self.closed:
+                return False
+            if self.count == len(self.slots):
+                self.dropped += 1
+                if self.drop_policy == "newest":
+                    return False
+                self.head = (self.head + 1) % len(self.slots)
+                self.count -= 1
+            self.slots[(self.head + self.count) % len(self.slots)].fill(video, canvas, timestamp)
+            self.count += 1
+            self._condition.notify()
+            return True
+
+    def get(self, timeout=None):
+        # Oldest queued frame, or None once closed and drained (or after timeout). The slot stays
+        # the encoder's until its next call.
+        with self._condition:
+            if not self.count and not self.closed:
+                self._condition.wait(timeout)
+            if not self.count:
+                return None
+            slot = self.slots[self.head]
+            self.slots[self.head] = self.spare
+            self.spare = slot
+            self.head = (self.head + 1) % len(self.slots)
+            self.count -= 1
+            return slot
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify()
+
+
+class SessionRecorder(threading.Thread):
+    # Records the annotated camera feed next to the canvas to a video file. The GUI thread only
+    # copies the two images into the ring (see submit); scaling, color conversion and encoding run
+    # in this thread. cv2 releases the GIL while resizing and encoding, so the GUI keeps its frame
+    # rate and a slow encoder only costs recorded frames, counted in dropped.
+    def __init__(self, path, fps=30.0, buffer_size=8, drop_policy="oldest", codec="mp4v"):
+        super().__init__(name="SessionRecorder", daemon=True)
+        self.path = path
+        self.fps = fps
+        self.codec = codec
+        self.ring = RecordingRing(buffer_size, drop_policy)
+        self.profiler = StageProfiler(enabled=True)  # compose and encode times
+        self.writer = None
+        self.frame = None  # Output frame, sized by the first frame submitted
+        self.left = None  # Camera and canvas halves of the output frame
+        self.right = None
+        self.next_due = None  # Timestamp from which the next frame is taken
+        self.submitted = 0
+        self.written = 0
+        self.error = None
+        self.start()
+
+    def submit(self, video, canvas, timestamp):
+        # Hand over an RGB camera frame and a BGRA canvas snapshot taken at timestamp (seconds).
+        # Frames arriving faster than fps are skipped so the video plays at its real speed.
+        if not self.wants_frame(timestamp):
+            return False
+        period = 1.0 / self.fps
+        if self.next_due is None or timestamp - self.next_due > period:
+            self.next_due = timestamp + period  # Start, or catch up after a stall without a burst
+        else:
+            self.next_due += period
+        self.submitted += 1
+        return self.ring.put(video, canvas, timestamp)
+
+    @property
+    def dropped(self):
+        return self.ring.dropped
+
+    def wants_frame(self, timestamp):
+        # False while the next frame would be skipped, so the caller can spare taking a snapshot.
+        # Frames up to half a period early count as on time, absorbing camera jitter.
+        return self.error is None and (self.next_due is None or timestamp >= self.next_due - 0.5 / self.fps)
+
+    def run(self):
+        while True:
+            slot = self.ring.get()
+            if slot is None:
+                break
+            if self.error is not None:
+                continue  # Drain the ring so stop() does not wait on it
+            with self.profiler.stage("compose"):
+                frame = self.compose(slot.video, slot.canvas)
+            if self.writer is None and not self.open_writer(frame):
+                continue
+            with self.profiler.stage("encode"):
+                self.writer.write(frame)
+            self.written += 1
+        if self.writer is not None:
+            self.writer.release()
+
+    def open_writer(self, frame):
+        height, width = frame.shape[:2]
+        self.writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.codec), self.fps, (width, height))
+        if not self.writer.isOpened():
+            self.error = f"Cannot write {self.path} with codec {self.codec}"
+            print(f"Error: {self.error}")
+            self.writer = None
+            return False
+        return True
+
+    def compose(self, video, canvas):
+        # Camera frame scaled to the canvas height on the left, canvas on the right, in one BGR frame
+        # whose size is fixed by the first frame (encoders need a constant size). Only cv2 calls
+        # into preallocated buffers, which run without the GIL.
+        if self.frame is None:
+            height = canvas.shape[0] - canvas.shape[0] % 2  # Encoders want even sizes
+            canvas_width = canvas.shape[1]
+            video_width = int(round(video.shape[1] * height / video.shape[0]))
+            video_width -= (video_width + canvas_width) % 2
+            self.left = np.empty((height, video_width, 3), dtype=np.uint8)
+            self.right = np.empty((height, canvas_width, 3), dtype=np.uint8)
+            self.frame = np.empty((height, video_width + canvas_width, 3), dtype=np.uint8)
+        height, video_width = self.left.shape[:2]
+        canvas_width = self.right.shape[1]
+        if video.shape[:2] != (height, video_width):
+            video = cv2.resize(video, (video_width, height), interpolation=cv2.INTER_LINEAR)
+        cv2.cvtColor(video, cv2.COLOR_RGB2BGR, dst=self.left)
+        if canvas.shape[0] == height + 1:
+            canvas = canvas[:height]
+        if canvas.shape[:2] != (height, canvas_width):
+            canvas = cv2.resize(canvas, (canvas_width, height), interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(canvas, cv2.COLOR_BGRA2BGR, dst=self.right)
+        cv2.hconcat([self.left, self.right], dst=self.frame)
+        return self.frame
+
+    def stop(self):
+        # Encode what is still queued and close the file
+        self.ring.close()
+        self.join()
+
+    def report(self):
+        summary = self.profiler.summary()
+        text = (f"Recording {self.path}: {self.written} frames written, {self.dropped} dropped of "
+                f"{self.submitted} submitted")
+        for stage in ("compose", "encode"):
+            if stage in summary:
+                text += f", {stage} {summary[stage]['mean_ms']:.1f} ms mean / {summary[stage]['p95_ms']:.1f} ms p95"
+        return text
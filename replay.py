@@ -0,0 +1,388 @@
+"""Headless replay and benchmark harness for the air-writing pipeline.
+
+Feeds a video file, a directory of images or a recorded landmark stream (.json/.npz) through the
+same gesture -> stroke logic as the app, without a camera or a display, and reports throughput,
+per-frame latency percentiles, the strokes produced and the jitter and lag of the pointer.
+
+    python replay.py --landmarks session.npz
+    python replay.py --landmarks session.npz --no-smoothing
+    python replay.py --landmarks session.npz --predict 60
+    python replay.py --video session.mp4 --save-landmarks session.npz
+    python replay.py --images frames/ --render --json report.json
+
+A replay has no live latency to follow, so the pointer is only predicted with --predict MS.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from features import INDEX_TIP, NUM_LANDMARKS, THUMB_TIP, hands_to_array
+from gestures import GestureInterpreter, GestureSink
+from smoothing import PointerFilter, add_pointer_filter_arguments, pointer_filter_from_arguments
+from spatial import SegmentGrid, erase, eraser_radius
+from strokes import Stroke, StrokeSimplifier, StrokeStore
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+# Packed QColor(...).rgba() values of the toolbar colors, so no Qt import is needed here
+TOOL_COLORS = {"blue": 0xFF0000FF, "red": 0xFFFF0000, "green": 0xFF00FF00}
+
+
+class LandmarkFrame:
+    # One frame of a replayed session: normalized hand landmarks plus the frame geometry
+    __slots__ = ("timestamp", "hands", "frame_width", "frame_height")
+
+    def __init__(self, timestamp, hands, frame_width, frame_height):
+        self.timestamp = timestamp  # Seconds since the start of the session
+        self.hands = hands  # (hands, 21, 3) array
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+
+
+class StrokeRecorder(GestureSink):
+    # Applies gestures to a StrokeStore the same way DrawingCanvas and MainWindow do
+    def __init__(self, simplifier=None):
+        self.trails = StrokeStore()
+        self.index = SegmentGrid()
+        self.current_trail = None
+        self.simplifier = simplifier if simplifier is not None else StrokeSimplifier()
+        self.color = TOOL_COLORS["blue"]
+        self.undos = 0
+        self.clears = 0
+        self.color_changes = 0
+        self.eraser_active = False
+        self.erasures = 0  # Eraser samples that removed something
+
+    def erase(self, x, y, thickness):
+        if erase(self.trails, self.index, x, y, eraser_radius(thickness)) is not None:
+            self.erasures += 1
+
+    def start_line(self, x, y, thickness):
+        if self.eraser_active:
+            self.erase(x, y, thickness)
+            return
+        self.current_trail = Stroke(self.color)
+        self.simplifier.accept(self.current_trail, x, y)
+        self.current_trail.append(x, y, thickness)
+
+    def add_point(self, x, y, thickness):
+        if self.eraser_active:
+            self.erase(x, y, thickness)
+            return
+        if self.current_trail is None:
+            self.current_trail = Stroke(self.color)
+        if self.simplifier.accept(self.current_trail, x, y):
+            self.current_trail.append(x, y, thickness)
+
+    def close_line(self):
+        if self.current_trail is not None and len(self.current_trail) >= 2:
+            trail = self.simplifier.finish(self.current_trail)
+            self.index.add_stroke(self.trails.append(trail), trail)
+        self.current_trail = None
+
+    def toolbar_action(self, action):
+        if action == "undo":
+            if self.trails:
+                for stroke_id, _ in self.trails.pop():
+                    self.index.remove_stroke(stroke_id)
+            self.undos += 1
+        elif action == "eraser":
+            if not self.eraser_active:
+                self.close_line()
+            self.eraser_active = True
+        else:
+            self.eraser_active = False
+            self.color = TOOL_COLORS[action]
+            self.color_changes += 1
+
+    def clear(self):
+        self.trails.clear()
+        self.index.clear()
+        self.current_trail = None
+        self.clears += 1
+
+
+class CanvasRecorder(StrokeRecorder):
+    # Also drives a real DrawingCanvas on the offscreen Qt platform so paint cost is included
+    def __init__(self, canvas_width, canvas_height, simplifier=None):
+        super().__init__(simplifier)
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt5.QtCore import QPoint
+        from PyQt5.QtGui import QColor
+        from PyQt5.QtWidgets import QApplication
+        from app import DrawingCanvas
+
+        self.QPoint = QPoint
+        self.QColor = QColor
+        self.application = QApplication.instance() or QApplication([])
+        self.canvas = DrawingCanvas()
+        self.canvas.simplifier = StrokeSimplifier(self.simplifier.min_distance, self.simplifier.tolerance,
+                                                  self.simplifier.thickness_weight)
+        self.canvas.resize(canvas_width, canvas_height)
+        self.canvas.show()
+
+    def erase(self, x, y, thickness):
+        super().erase(x, y, thickness)
+        self.canvas.erase_at(self.QPoint(x, y), eraser_radius(thickness))
+
+    def start_line(self, x, y, thickness):
+        super().start_line(x, y, thickness)
+        if self.eraser_active:
+            return
+        self.canvas.start_new_line(self.QPoint(x, y), thickness, self.QColor.fromRgba(self.color))
+
+    def add_point(self, x, y, thickness):
+        super().add_point(x, y, thickness)
+        if self.eraser_active:
+            return
+        self.canvas.add_point(self.QPoint(x, y), thickness, self.QColor.fromRgba(self.color))
+
+    def close_line(self):
+        super().close_line()
+        self.canvas.close_line()
+
+    def toolbar_action(self, action):
+        super().toolbar_action(action)
+        if action == "undo":
+            self.canvas.undo_last_trail()
+
+    def pointer_moved(self, x, y, thickness):
+        self.canvas.update_pointer_position(self.QPoint(x, y))
+        self.canvas.update_pointer_color_and_thickness(self.QColor.fromRgba(self.color), int(thickness))
+
+    def clear(self):
+        super().clear()
+        self.canvas.clear()
+
+    def end_frame(self):
+        # Deliver the frame's pending updates so only the dirty areas are painted, like the event loop would
+        self.application.processEvents()
+
+
+def load_landmark_stream(path):
+    # Yield LandmarkFrames from a stream written by save_landmark_stream
+    if path.endswith(".npz"):
+        data = np.load(path)
+        frame_width, frame_height = (int(v) for v in data["frame_size"])
+        landmarks, hand_counts, timestamps = data["landmarks"], data["hand_counts"], data["timestamps"]
+        for i in range(len(landmarks)):
+            hands = landmarks[i, :hand_counts[i]].astype(np.float64)
+            yield LandmarkFrame(float(timestamps[i]), hands, frame_width, frame_height)
+    else:
+        with open(path) as f:
+            data = json.load(f)
+        frame_width, frame_height = data["frame_width"], data["frame_height"]
+        for frame in data["frames"]:
+            hands = np.array(frame["hands"], dtype=np.float64).reshape(-1, NUM_LANDMARKS, 3)
+            yield LandmarkFrame(frame["t"], hands, frame_width, frame_height)
+
+
+def save_landmark_stream(path, frames):
+    # Write LandmarkFrames as .npz (padded arrays) or .json, chosen by the file extension
+    if not frames:
+        raise ValueError("No frames to save")
+    frame_width, frame_height = frames[0].frame_width, frames[0].frame_height
+    if path.endswith(".npz"):
+        max_hands = max(1, max(len(frame.hands) for frame in frames))
+        landmarks = np.full((len(frames), max_hands, NUM_LANDMARKS, 3), np.nan, dtype=np.float32)
+        hand_counts = np.zeros(len(frames), dtype=np.int32)
+        for i, frame in enumerate(frames):
+            landmarks[i, :len(frame.hands)] = frame.hands
+            hand_counts[i] = len(frame.hands)
+        timestamps = np.array([frame.timestamp for frame in frames], dtype=np.float64)
+        np.savez_compressed(path, landmarks=landmarks, hand_counts=hand_counts, timestamps=timestamps,
+                            frame_size=np.array([frame_width, frame_height]))
+    else:
+        data = {
+            "frame_width": frame_width,
+            "frame_height": frame_height,
+            "frames": [{"t": frame.timestamp, "hands": frame.hands.tolist()} for frame in frames],
+        }
+        with open(path, "w") as f:
+            json.dump(data, f)
+
+
+def read_frames(video=None, images=None, fps=30.0):
+    # Yield (timestamp, BGR frame) pairs from a video file or an image directory
+    import cv2
+
+    if video is not None:
+        capture = cv2.VideoCapture(video)
+        if not capture.isOpened():
+            raise OSError(f"Cannot open video {video}")
+        video_fps = capture.get(cv2.CAP_PROP_FPS) or fps
+        index = 0
+        while True:
+            ret, frame = capture.read()
+            if not ret:
+                break
+            yield index / video_fps, frame
+            index += 1
+        capture.release()
+    else:
+        names = sorted(name for name in os.listdir(images) if name.lower().endswith(IMAGE_EXTENSIONS))
+        for index, name in enumerate(names):
+            frame = cv2.imread(os.path.join(images, name))
+            if frame is not None:
+                yield index / fps, frame
+
+
+def detect_landmarks(frames):
+    # Run MediaPipe Hands on mirrored frames exactly like the app's pipeline, yielding LandmarkFrames
+    # and the time spent in inference
+    import cv2
+    import mediapipe as mp
+
+    hands = mp.solutions.hands.Hands()
+    for timestamp, frame in frames:
+        start = time.perf_counter()
+        frame = cv2.flip(frame, 1)
+        result = hands.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        elapsed = time.perf_counter() - start
+        frame_height, frame_width = frame.shape[:2]
+        yield LandmarkFrame(timestamp, hands_to_array(result.multi_hand_landmarks), frame_width, frame_height), elapsed
+    hands.close()
+
+
+def replay(frames, recorder, canvas_width, canvas_height, pointer_filter=None):
+    # Run every frame through the gesture logic and collect timings. frames yields
+    # (LandmarkFrame, seconds already spent producing it) pairs.
+    gestures = GestureInterpreter(pointer_filter)
+    latencies = []
+    processed = []
+    start = time.perf_counter()
+    for frame, elapsed in frames:
+        frame_start = time.perf_counter()
+        gestures.process_frame(frame.hands, frame.frame_width, frame.frame_height, canvas_width, canvas_height,
+                               frame.timestamp, recorder)
+        if isinstance(recorder, CanvasRecorder):
+            recorder.end_frame()
+        latencies.append(elapsed + time.perf_counter() - frame_start)
+        processed.append(frame)
+    recorder.close_line()
+    total = time.perf_counter() - start
+    return processed, np.array(latencies), total
+
+
+def pointer_metrics(frames, canvas_width, canvas_height, pointer_filter, window=5, max_lag=0.2):
+    # Jitter and lag of the pointer of the first hand, raw, smoothed and predicted by pointer_filter.
+    # Jitter is the RMS second difference between frames, in canvas pixels. Lag is the delay in ms
+    # that best aligns a trace with a centered moving average of the raw positions, which follows the
+    # hand without lagging; error is the RMS distance left at that delay.
+    pointer_filter.reset()
+    runs = [[]]  # Stretches without a gap long enough to reset the filter
+    last_time = None
+    for frame in frames:
+        if not len(frame.hands):
+            continue
+        x, y = (frame.hands[0, THUMB_TIP, :2] + frame.hands[0, INDEX_TIP, :2]) / 2 * (canvas_width, canvas_height)
+        if last_time is not None and frame.timestamp - last_time > pointer_filter.reset_after:
+            runs.append([])
+        last_time = frame.timestamp
+        runs[-1].append((frame.timestamp, x, y, *pointer_filter.filter_hands([(x, y)], frame.timestamp)[0]))
+    runs = [np.array(run) for run in runs if len(run) > window]  # Columns: time, raw, smoothed, predicted x/y
+    if not runs:
+        return {}
+
+    shifts = np.arange(-100, int(max_lag * 1000) + 1) / 1000
+    kernel = np.ones(window) / window
+    half = window // 2
+    traces = (("raw", 1), ("smooth", 3), ("pred", 5)) if pointer_filter.horizon > 0 else (("raw", 1), ("smooth", 3))
+    report = {}
+    for name, column in traces:
+        squared_jitter = 0.0
+        jitter_count = 0
+        errors = np.zeros(len(shifts))
+        counts = np.zeros(len(shifts))
+        for run in runs:
+            times = run[:, 0]
+            trace = run[:, column:column + 2]
+            jitter = np.diff(trace, 2, axis=0)
+            squared_jitter += float((jitter ** 2).sum())
+            jitter_count += len(jitter)
+            reference_times = times[half:len(times) - half]
+            reference = [np.convolve(run[:, axis], kernel, mode="valid") for axis in (1, 2)]
+            for k, shift in enumerate(shifts):
+                # The trace at t against the reference at t - shift, where the reference is defined
+                query = times - shift
+                inside = (query >= reference_times[0]) & (query <= reference_times[-1])
+                for axis in (0, 1):
+                    difference = trace[inside, axis] - np.interp(query[inside], reference_times, reference[axis])
+                    errors[k] += float((difference ** 2).sum())
+                counts[k] += inside.sum()
+        valid = counts > 0
+        rms = np.sqrt(errors[valid] / counts[valid])
+        best = int(np.argmin(rms))
+        report[f"jitter_{name}_px"] = (squared_jitter / max(jitter_count, 1)) ** 0.5
+        report[f"lag_{name}_ms"] = float(shifts[valid][best] * 1000)
+        report[f"error_{name}_px"] = float(rms[best])
+    return report
+
+
+def summarize(latencies, total, recorder):
+    # Throughput, latency percentiles in milliseconds and the drawing that was produced
+    report = {
+        "frames": int(len(latencies)),
+        "seconds": total,
+        "fps": len(latencies) / total if total > 0 else 0.0,
+        "strokes": len(recorder.trails),
+        "points": recorder.trails.point_count(),
+        "samples": recorder.simplifier.samples_received,
+        "reduction_ratio": recorder.simplifier.reduction_ratio(),
+        "undos": recorder.undos,
+        "clears": recorder.clears,
+        "color_changes": recorder.color_changes,
+        "erasures": recorder.erasures,
+    }
+    if len(latencies):
+        p50, p90, p99 = np.percentile(latencies * 1000, [50, 90, 99])
+        report.update(latency_ms_p50=p50, latency_ms_p90=p90, latency_ms_p99=p99,
+                      latency_ms_max=float(latencies.max() * 1000))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--video", help="Video file to run MediaPipe Hands on")
+    source.add_argument("--images", help="Directory of images, replayed in file name order")
+    source.add_argument("--landmarks", help="Recorded landmark stream (.json or .npz)")
+    parser.add_argument("--fps", type=float, default=30.0, help="Frame rate assumed for image directories")
+    parser.add_argument("--canvas-size", default="800x600", help="Canvas size the pointer is mapped to, WIDTHxHEIGHT")
+    parser.add_argument("--render", action="store_true", help="Also paint a DrawingCanvas on the offscreen Qt platform")
+    parser.add_argument("--dedupe-distance", type=float, default=1.5, help="Ingest deduplication distance in pixels, 0 to keep all")
+    parser.add_argument("--simplify-tolerance", type=float, default=0.75, help="Stroke simplification tolerance in pixels, 0 to disable")
+    add_pointer_filter_arguments(parser)
+    parser.add_argument("--save-landmarks", help="Write the detected landmarks to a .json or .npz stream")
+    parser.add_argument("--json", help="Write the report to this file as JSON")
+    args = parser.parse_args()
+
+    canvas_width, canvas_height = (int(v) for v in args.canvas_size.lower().split("x"))
+    simplifier = StrokeSimplifier(args.dedupe_distance, args.simplify_tolerance)
+    recorder = CanvasRecorder(canvas_width, canvas_height, simplifier) if args.render else StrokeRecorder(simplifier)
+
+    if args.landmarks:
+        frames = ((frame, 0.0) for frame in load_landmark_stream(args.landmarks))
+    else:
+        frames = detect_landmarks(read_frames(args.video, args.images, args.fps))
+
+    pointer_filter = pointer_filter_from_arguments(args)
+    processed, latencies, total = replay(frames, recorder, canvas_width, canvas_height, pointer_filter)
+    if args.save_landmarks:
+        save_landmark_stream(args.save_landmarks, processed)
+
+    report = summarize(latencies, total, recorder)
+    report.update(pointer_metrics(processed, canvas_width, canvas_height,
+                                  pointer_filter if pointer_filter is not None else PointerFilter(smoothing=False)))
+    for key, value in report.items():
+        print(f"{key:>16}: {value:.2f}" if isinstance(value, float) else f"{key:>16}: {value}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import cv2
+
+
+class RegionOfInterest:
+    # Crops a padded square around the last detected hands and downscales it for inference, so the
+    # hand model sees a small image in which the hand is large. Landmarks found in the crop are
+    # mapped back to normalized full-frame coordinates.
+    def __init__(self, inference_size=256, padding=0.5, min_size=96):
+        self.inference_size = inference_size  # Longest side of the image passed to the model
+        self.padding = padding  # Extra margin around the hands, relative to their box size
+        self.min_size = min_size  # Smallest crop side in frame pixels
+        self.box = None  # (x0, y0, x1, y1) in frame pixels, None to search the full frame
+
+    def update(self, hands, frame_width, frame_height):
+        # Center the next crop on the hands just found; no hands means searching the full frame again
+        if len(hands) == 0:
+            self.box = None
+            return
+        xs = hands[:, :, 0] * frame_width
+        ys = hands[:, :, 1] * frame_height
+        center_x = (xs.min() + xs.max()) / 2
+        center_y = (ys.min() + ys.max()) / 2
+        side = max(xs.max() - xs.min(), ys.max() - ys.min()) * (1 + 2 * self.padding)
+        side = min(max(side, self.min_size), max(frame_width, frame_height))
+
+        x0 = int(round(center_x - side / 2))
+        y0 = int(round(center_y - side / 2))
+        x1 = int(round(center_x + side / 2))
+        y1 = int(round(center_y + side / 2))
+        # Clip to the frame; near the edges the crop becomes rectangular instead of shifting the hand
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(frame_width, x1), min(frame_height, y1)
+        self.box = (x0, y0, x1, y1) if x1 - x0 > 1 and y1 - y0 > 1 else None
+
+    def crop(self, frame):
+        # Crop the BGR frame to the current box and downscale it to the inference size
+        x0, y0, x1, y1 = self.box
+        crop = frame[y0:y1, x0:x1]
+        scale = self.inference_size / max(x1 - x0, y1 - y0)
+        if scale < 1:
+            crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return crop
+
+    def to_frame(self, hands, frame_width, frame_height):
+        # Map landmarks normalized to the crop back to landmarks normalized to the full frame.
+        # The resize does not change normalized coordinates, only the crop offset and size matter.
+        x0, y0, x1, y1 = self.box
+        hands = hands.copy()
+        hands[:, :, 0] = (hands[:, :, 0] * (x1 - x0) + x0) / frame_width
+        hands[:, :, 1] = (hands[:, :, 1] * (y1 - y0) + y0) / frame_height
+        # MediaPipe scales z roughly like x
+        hands[:, :, 2] = hands[:, :, 2] * (x1 - x0) / frame_width
+        return hands
@@ -0,0 +1,190 @@
+import argparse
+import math
+
+
+class OneEuroFilter:
+    # One Euro filter (Casiez et al., CHI 2012) for one coordinate: a low-pass filter whose cutoff
+    # frequency rises with speed, so a still hand is steady and a moving one is followed closely.
+    # min_cutoff (Hz) sets the smoothing at rest, lower is smoother; beta (per pixel/s) how quickly
+    # the cutoff rises with speed, higher lags less.
+    def __init__(self, min_cutoff=1.0, beta=0.007, derivative_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.derivative_cutoff = derivative_cutoff
+        self.value = None
+        self.derivative = 0.0
+        self.time = None
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, value, time):
+        if self.value is None:
+            self.value = value
+            self.time = time
+            return value
+        dt = time - self.time
+        if dt <= 0:
+            return self.value  # Same frame seen twice
+        derivative = (value - self.value) / dt
+        self.derivative += self._alpha(self.derivative_cutoff, dt) * (derivative - self.derivative)
+        cutoff = self.min_cutoff + self.beta * abs(self.derivative)
+        self.value += self._alpha(cutoff, dt) * (value - self.value)
+        self.time = time
+        return self.value
+
+
+class VelocityKalman:
+    # Constant-velocity Kalman filter for one coordinate, with white-noise acceleration. Estimates
+    # the velocity of the (smoothed) pointer so predict() can extrapolate its position.
+    # acceleration_noise (pixels/s^2) is how abruptly the hand is expected to change speed,
+    # measurement_noise (pixels) how noisy the positions it is given are.
+    def __init__(self, acceleration_noise=1000.0, measurement_noise=1.0):
+        self.q = acceleration_noise ** 2
+        self.r = measurement_noise ** 2
+        self.position = None
+        self.velocity = 0.0
+        self.p = None  # Covariance (p00, p01, p11)
+        self.time = None
+
+    def update(self, position, time):
+        if self.position is None:
+            self.position = position
+            self.p = (self.r, 0.0, 1e6)  # Velocity unknown
+            self.time = time
+            return
+        dt = time - self.time
+        if dt <= 0:
+            return
+        # Predict
+        p00, p01, p11 = self.p
+        predicted = self.position + self.velocity * dt
+        dt2 = dt * dt
+        p00 = p00 + 2 * dt * p01 + dt2 * p11 + self.q * dt2 * dt2 / 4
+        p01 = p01 + dt * p11 + self.q * dt2 * dt / 2
+        p11 = p11 + self.q * dt2
+        # Correct with the measured position
+        innovation = position - predicted
+        s = p00 + self.r
+        k0 = p00 / s
+        k1 = p01 / s
+        self.position = predicted + k0 * innovation
+        self.velocity += k1 * innovation
+        self.p = ((1 - k0) * p00, (1 - k0) * p01, p11 - k1 * p01)
+        self.time = time
+
+    def predict(self, horizon):
+        return self.position + self.velocity * horizon
+
+
+class HandTrack:
+    # Filter state of one hand followed from frame to frame
+    __slots__ = ("x_filter", "y_filter", "x_predictor", "y_predictor", "x", "y")
+
+    def __init__(self, min_cutoff, beta):
+        self.x_filter = OneEuroFilter(min_cutoff, beta)
+        self.y_filter = OneEuroFilter(min_cutoff, beta)
+        self.x_predictor = VelocityKalman()
+        self.y_predictor = VelocityKalman()
+        self.x = None  # Last raw position, to match the hand in the next frame
+        self.y = None
+
+
+class PointerFilter:
+    # Filtering stage between the landmarks and the canvas: One Euro smoothing of the pinch point of
+    # each hand, and a constant-velocity prediction horizon seconds ahead to make up for the
+    # capture -> inference -> paint latency. horizon None follows the latencies given to
+    # observe_latency, up to max_horizon. MediaPipe's hand order is not stable from frame to frame,
+    # so hands are matched to the previous frame's by position; the state restarts when the number
+    # of hands changes or no hand was seen for reset_after seconds.
+    def __init__(self, min_cutoff=1.0, beta=0.007, horizon=None, max_horizon=0.1, smoothing=True, reset_after=0.25):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.smoothing = smoothing
+        self.max_horizon = max_horizon
+        self.follow_latency = horizon is None
+        self.horizon = 0.0  # Seconds to extrapolate the pointer by
+        if horizon is not None:
+            self.set_latency(horizon)
+        self.reset_after = reset_after
+        self.tracks = []  # HandTrack of each hand of the previous frame
+        self.time = None  # Time of the previous frame
+        self.latency = None  # Moving average of the latencies given to observe_latency
+
+    def set_latency(self, seconds):
+        self.horizon = min(max(0.0, seconds), self.max_horizon)
+
+    def observe_latency(self, seconds, weight=0.1):
+        # Predict by the average of the measured latencies rather than by the last one, which
+        # jumps with the frame the camera or the model happened to be on
+        self.latency = seconds if self.latency is None else self.latency + weight * (seconds - self.latency)
+        if self.follow_latency:
+            self.set_latency(self.latency)
+
+    def filter_hands(self, positions, time):
+        # (smoothed x, smoothed y, predicted x, predicted y) for the raw (x, y) position in canvas
+        # pixels of each hand of a frame, in the same order
+        if len(positions) != len(self.tracks) or self.time is None or time - self.time > self.reset_after:
+            tracks = [HandTrack(self.min_cutoff, self.beta) for _ in positions]
+        else:
+            tracks = self.match(positions)
+        self.tracks = tracks
+        self.time = time
+        return [self.update(track, x, y, time) for track, (x, y) in zip(tracks, positions)]
+
+    def match(self, positions):
+        # The previous tracks reordered to follow positions, pairing the closest hands first
+        pairs = sorted(((x - track.x) ** 2 + (y - track.y) ** 2, i, j)
+                       for i, (x, y) in enumerate(positions) for j, track in enumerate(self.tracks))
+        matched = [None] * len(positions)
+        taken = set()
+        for _, i, j in pairs:
+            if matched[i] is None and j not in taken:
+                matched[i] = self.tracks[j]
+                taken.add(j)
+        return matched
+
+    def update(self, track, x, y, time):
+        track.x = x
+        track.y = y
+        if self.smoothing:
+            x = track.x_filter(x, time)
+            y = track.y_filter(y, time)
+        track.x_predictor.update(x, time)  # Kept up to date so the horizon can change at any time
+        track.y_predictor.update(y, time)
+        if self.horizon <= 0:
+            return x, y, x, y
+        return x, y, track.x_predictor.predict(self.horizon), track.y_predictor.predict(self.horizon)
+
+    def reset(self):
+        self.tracks = []
+        self.time = None
+
+
+def parse_prediction(text):
+    # --predict argument: "auto" (None, follow the measured latency) or a horizon in milliseconds
+    if text == "auto":
+        return None
+    try:
+        return max(0.0, float(text)) / 1000
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected 'auto' or milliseconds, got {text!r}")
+
+
+def add_pointer_filter_arguments(parser):
+    # The pointer filter options, shared by the app, engine.py and replay.py
+    parser.add_argument("--smoothing-min-cutoff", type=float, default=1.0, help="One Euro filter cutoff at rest in Hz, lower steadies a still hand more (default: 1)")
+    parser.add_argument("--smoothing-beta", type=float, default=0.007, help="One Euro filter speed coefficient, higher lags less on fast moves (default: 0.007)")
+    parser.add_argument("--no-smoothing", action="store_true", help="Do not smooth the pointer and strokes")
+    parser.add_argument("--predict", type=parse_prediction, default=None, metavar="auto|MS", help="Extrapolate the pointer by the measured capture-to-gesture latency (auto), or by MS milliseconds, 0 to disable (default: auto)")
+    parser.add_argument("--max-prediction-ms", type=float, default=100.0, help="Longest prediction horizon in milliseconds (default: 100)")
+
+
+def pointer_filter_from_arguments(args):
+    # PointerFilter for the options of add_pointer_filter_arguments, or None when smoothing and prediction are off
+    if args.no_smoothing and args.predict == 0:
+        return None
+    return PointerFilter(args.smoothing_min_cutoff, args.smoothing_beta, args.predict, args.max_prediction_ms / 1000,
+                         smoothing=not args.no_smoothing)
@@ -0,0 +1,164 @@
+import math
+
+from strokes import Stroke
+
+
+class SegmentGrid:
+    # Uniform grid over the segments of finished strokes. Each cell maps stroke ids to the segments
+    # whose pen-padded bounding box overlaps the cell, so point and rectangle queries only look at
+    # the strokes near the query instead of every stroke on the canvas.
+    def __init__(self, cell_size=32):
+        self.cell_size = cell_size  # Pixels
+        self.cells = {}  # (column, row) -> {stroke_id: [segment indices]}
+        self.strokes = {}  # stroke_id -> Stroke
+        self.stroke_cells = {}  # stroke_id -> cells the stroke was added to, for removal
+
+    def add_stroke(self, stroke_id, stroke):
+        size = self.cell_size
+        xs, ys, thicknesses = stroke.xs, stroke.ys, stroke.thicknesses
+        occupied = set()
+        for i in range(1, len(xs)):
+            # Segment i goes from point i - 1 to point i, drawn with the width of point i. The square
+            # pen caps reach up to width / sqrt(2) past the end points, so pad by the full width.
+            margin = thicknesses[i]
+            column0 = int((min(xs[i - 1], xs[i]) - margin) // size)
+            column1 = int((max(xs[i - 1], xs[i]) + margin) // size)
+            row0 = int((min(ys[i - 1], ys[i]) - margin) // size)
+            row1 = int((max(ys[i - 1], ys[i]) + margin) // size)
+            for column in range(column0, column1 + 1):
+                for row in range(row0, row1 + 1):
+                    cell = (column, row)
+                    self.cells.setdefault(cell, {}).setdefault(stroke_id, []).append(i)
+                    occupied.add(cell)
+        self.strokes[stroke_id] = stroke
+        self.stroke_cells[stroke_id] = occupied
+
+    def remove_stroke(self, stroke_id):
+        for cell in self.stroke_cells.pop(stroke_id, ()):
+            entries = self.cells[cell]
+            del entries[stroke_id]
+            if not entries:
+                del self.cells[cell]
+        self.strokes.pop(stroke_id, None)
+
+    def clear(self):
+        self.cells = {}
+        self.strokes = {}
+        self.stroke_cells = {}
+
+    def _cells_in(self, x0, y0, x1, y1):
+        size = self.cell_size
+        for column in range(int(x0 // size), int(x1 // size) + 1):
+            for row in range(int(y0 // size), int(y1 // size) + 1):
+                entries = self.cells.get((column, row))
+                if entries:
+                    yield entries
+
+    def strokes_in_rect(self, x0, y0, x1, y1):
+        # Ids of the strokes that may paint inside the rectangle
+        found = set()
+        for entries in self._cells_in(x0, y0, x1, y1):
+            found.update(entries)
+        return found
+
+    def segments_near(self, x, y, radius):
+        # {stroke_id: set of segment indices} of the segments whose drawn line comes within radius
+        # of (x, y)
+        hits = {}
+        for entries in self._cells_in(x - radius, y - radius, x + radius, y + radius):
+            for stroke_id, segments in entries.items():
+                stroke = self.strokes[stroke_id]
+                for i in segments:
+                    reach = radius + stroke.thicknesses[i] / 2
+                    if _distance_to_segment(x, y, stroke.xs[i - 1], stroke.ys[i - 1], stroke.xs[i], stroke.ys[i]) <= reach:
+                        hits.setdefault(stroke_id, set()).add(i)
+        return hits
+
+
+def _distance_to_segment(x, y, x0, y0, x1, y1):
+    dx, dy = x1 - x0, y1 - y0
+    length_squared = dx * dx + dy * dy
+    t = 0.0
+    if length_squared:
+        t = max(0.0, min(1.0, ((x - x0) * dx + (y - y0) * dy) / length_squared))
+    return math.hypot(x - (x0 + t * dx), y - (y0 + t * dy))
+
+
+def eraser_radius(thickness):
+    # The eraser grows with the stroke thickness, i.e. as the hand gets closer to the camera
+    return max(10.0, 2.0 * thickness)
+
+
+def erase(store, grid, x, y, radius):
+    # Remove the parts of strokes in store within radius of (x, y), splitting strokes into the pieces
+    # that remain. Segments under the eraser are cut where they enter and leave it rather than dropped
+    # whole, since simplified strokes can have long segments. Returns the bounding box (x0, y0, x1, y1)
+    # of the strokes that changed, or None if nothing was under the eraser.
+    hits = grid.segments_near(x, y, radius)
+    if not hits:
+        return None
+
+    dirty = None
+    for stroke_id, erased in hits.items():
+        stroke = store.get(stroke_id)
+        grid.remove_stroke(stroke_id)
+        dirty = _union(dirty, stroke.bounds())
+
+        pieces = []
+        piece = None
+        for i in range(1, len(stroke)):
+            if i not in erased:
+                if piece is None:
+                    piece = [stroke.point(i - 1)]
+                piece.append(stroke.point(i))
+                continue
+            # Segment i is drawn with the width of point i, so are the pieces cut from it
+            x0, y0, _ = stroke.point(i - 1)
+            x1, y1, thickness = stroke.point(i)
+            start, end = _inside_circle(x, y, radius + thickness / 2, x0, y0, x1, y1)
+            length = math.hypot(x1 - x0, y1 - y0)
+            if start * length >= 1:
+                if piece is None:
+                    piece = [stroke.point(i - 1)]
+                # Cut points are rounded away from the eraser so the pieces are not hit again
+                piece.append((x0 + int(start * (x1 - x0)), y0 + int(start * (y1 - y0)), thickness))
+            _keep(pieces, stroke.color, piece)
+            piece = None
+            if (1 - end) * length >= 1:
+                piece = [(x1 - int((1 - end) * (x1 - x0)), y1 - int((1 - end) * (y1 - y0)), thickness), (x1, y1, thickness)]
+        _keep(pieces, stroke.color, piece)
+        # The pieces take the place of the stroke, in the drawing order and for undo
+        for piece_id, piece in store.replace(stroke_id, pieces):
+            grid.add_stroke(piece_id, piece)
+    return dirty
+
+
+def _inside_circle(x, y, radius, x0, y0, x1, y1):
+    # Parameter interval (start, end) within [0, 1] of the segment part inside the circle
+    dx, dy = x1 - x0, y1 - y0
+    fx, fy = x0 - x, y0 - y
+    a = dx * dx + dy * dy
+    b = 2 * (fx * dx + fy * dy)
+    c = fx * fx + fy * fy - radius * radius
+    discriminant = b * b - 4 * a * c
+    if a == 0 or discriminant < 0:
+        return 0.0, 1.0
+    root = math.sqrt(discriminant)
+    return max(0.0, (-b - root) / (2 * a)), min(1.0, (-b + root) / (2 * a))
+
+
+def _keep(pieces, color, points):
+    # Add a piece that survived the eraser to pieces as a stroke of its own
+    if points is None or len(points) < 2:
+        return
+    piece = Stroke(color)
+    for px, py, thickness in points:
+        piece.append(px, py, thickness)
+    piece.samples = len(points)
+    pieces.append(piece)
+
+
+def _union(a, b):
+    if a is None:
+        return b
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
@@ -0,0 +1,112 @@
+import multiprocessing
+import queue
+import time
+
+import numpy as np
+
+from features import NUM_LANDMARKS
+
+
+class StationFrame:
+    # Landmarks of one processed frame of a station, as received by the wall process
+    __slots__ = ("station", "timestamp", "frame_width", "frame_height", "hands")
+
+    def __init__(self, station, timestamp, frame_width, frame_height, hands):
+        self.station = station  # Position of the camera in the --stations list
+        self.timestamp = timestamp  # time.perf_counter() right after the frame was read, comparable across processes
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        self.hands = hands  # (hands, 21, 3) normalized landmarks
+
+
+def station_main(station, camera_index, settings, messages, stop_event):
+    # Entry point of a station process: camera capture and hand inference with the same threaded
+    # pipeline as the single-camera app. Only the landmarks travel back to the wall, as a compact
+    # (hands x 21 x 3 float64) byte string of at most a few hundred bytes per frame.
+    import mediapipe as mp
+
+    from cameras import open_camera
+    from pipeline import FramePipeline
+    from roi import RegionOfInterest
+    from tracking import InferenceScheduler
+
+    video_capture = open_camera(camera_index, *settings["capture"])
+    if video_capture is None:
+        messages.put(("error", station, f"Cannot open camera {camera_index}"))
+        return
+    hands = mp.solutions.hands.Hands(model_complexity=settings["model_complexity"],
+                                     max_num_hands=settings["max_num_hands"])
+    scheduler = InferenceScheduler(settings["target_fps"], settings["max_detection_interval"]) if settings["adaptive"] else None
+    region = RegionOfInterest(settings["roi_size"], settings["roi_padding"]) if settings["roi"] else None
+    pipeline = FramePipeline(video_capture, hands, scheduler=scheduler, region=region)
+    pipeline.start()
+
+    dropped = 0
+    try:
+        while not stop_event.is_set():
+            packet = pipeline.processed_frames.get(timeout=0.1)
+            if packet is None or not packet.ok:
+                continue
+            frame_height, frame_width = packet.frame.shape[:2]
+            packet.release()
+            landmarks = np.ascontiguousarray(packet.hands, dtype=np.float64)
+            try:
+                messages.put_nowait(("frame", station, packet.timestamp, frame_width, frame_height,
+                                     len(landmarks), landmarks.tobytes()))
+            except queue.Full:
+                dropped += 1  # The wall fell behind; newer frames matter more than this one
+    finally:
+        pipeline.stop()
+        video_capture.release()
+        hands.close()
+        # Exit without waiting for the wall to read what is still queued
+        messages.cancel_join_thread()
+        if dropped:
+            print(f"Station {station}: {dropped} frames dropped by the wall")
+
+
+class StationPool:
+    # One capture+inference process per camera, so each station's MediaPipe model runs on its own
+    # core outside the GIL of the wall process. Processes are spawned rather than forked, which
+    # would copy the Qt state and threads of the parent.
+    def __init__(self, camera_indices, settings, queue_size=256):
+        context = multiprocessing.get_context("spawn")
+        self.camera_indices = list(camera_indices)
+        self.messages = context.Queue(queue_size)
+        self.stop_event = context.Event()
+        self.processes = [
+            context.Process(target=station_main, args=(station, camera_index, settings, self.messages, self.stop_event),
+                            name=f"Station-{station}", daemon=True)
+            for station, camera_index in enumerate(self.camera_indices)
+        ]
+
+    def start(self):
+        for process in self.processes:
+            process.start()
+
+    def poll(self, max_messages=256):
+        # Every frame received since the last call, in arrival order; never blocks. Error messages
+        # from the stations are printed.
+        frames = []
+        for _ in range(max_messages):
+            try:
+                message = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == "error":
+                _, station, text = message
+                print(f"Error: Station {station}: {text}")
+                continue
+            _, station, timestamp, frame_width, frame_height, count, data = message
+            hands = np.frombuffer(data, dtype=np.float64).reshape(count, NUM_LANDMARKS, 3)
+            frames.append(StationFrame(station, timestamp, frame_width, frame_height, hands))
+        return frames
+
+    def stop(self, timeout=2.0):
+        self.stop_event.set()
+        deadline = time.monotonic() + timeout
+        for process in self.processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()
+        self.messages.close()
@@ -0,0 +1,286 @@
+import mmap
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+from array import array
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from spatial import SegmentGrid, erase
+from strokes import Stroke, StrokeStore
+
+# Drawing file (.awd): header, one (color, first point, point count) entry per stroke, then the xs,
+# ys and thicknesses of all strokes as three contiguous little-endian arrays, so a drawing is loaded
+# by mapping the file and slicing it, without parsing anything per point
+DRAWING_MAGIC = b"AWD1"
+DRAWING_HEADER = struct.Struct("<4sII")  # magic, stroke count, point count
+STROKE_TABLE_DTYPE = np.dtype([("color", "<u4"), ("start", "<u4"), ("count", "<u4")])
+
+# Autosave journal (.awj): magic, then records of (type, payload length, payload). Records are only
+# ever appended, so after a crash everything up to the last complete record can be replayed.
+JOURNAL_MAGIC = b"AWJ1"
+RECORD_HEADER = struct.Struct("<BI")
+STROKE_HEADER = struct.Struct("<II")  # color, point count; followed by xs, ys and thicknesses
+# x, y, radius; the radius is kept as the double the canvas erased with, so a replayed erase
+# splits strokes exactly where the live one did (and later RECORD_REMOVE ids stay valid)
+ERASE_RECORD = struct.Struct("<iid")
+LEGACY_ERASE_RECORD = struct.Struct("<iif")  # Journals written before the radius was a double
+REMOVE_RECORD = struct.Struct("<I")  # stroke id
+RECORD_STROKE, RECORD_UNDO, RECORD_CLEAR, RECORD_ERASE, RECORD_REMOVE = 1, 2, 3, 4, 5
+
+
+def _little_endian(values):
+    # The file formats are little-endian, array.array uses the native byte order
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def _from_little_endian(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def save_drawing(path, strokes):
+    # Write the strokes to a drawing file, replacing it atomically
+    strokes = list(strokes)
+    table = np.zeros(len(strokes), dtype=STROKE_TABLE_DTYPE)
+    start = 0
+    for i, stroke in enumerate(strokes):
+        table[i] = (stroke.color, start, len(stroke))
+        start += len(stroke)
+
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(DRAWING_HEADER.pack(DRAWING_MAGIC, len(strokes), start))
+        file.write(table.tobytes())
+        for field in ("xs", "ys", "thicknesses"):
+            for stroke in strokes:
+                file.write(_little_endian(getattr(stroke, field)))
+    os.replace(temporary_path, path)
+
+
+def load_drawing(path):
+    # List of the strokes in a drawing file. The file is memory-mapped and each stroke copies its
+    # slice of the point arrays in one go.
+    with open(path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        if size < DRAWING_HEADER.size:
+            raise ValueError(f"{path} is not a drawing file")
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic, stroke_count, point_count = DRAWING_HEADER.unpack_from(data)
+            if magic != DRAWING_MAGIC:
+                raise ValueError(f"{path} is not a drawing file")
+            offset = DRAWING_HEADER.size
+            table = np.frombuffer(data, dtype=STROKE_TABLE_DTYPE, count=stroke_count, offset=offset).copy()
+            if len(table) and (table["start"].astype(np.int64) + table["count"]).max() > point_count:
+                raise ValueError(f"{path} is damaged: a stroke lies outside the point arrays")
+            offset += table.nbytes
+            xs_offset = offset
+            ys_offset = xs_offset + 4 * point_count
+            thicknesses_offset = ys_offset + 4 * point_count
+            if thicknesses_offset + 4 * point_count > size:
+                raise ValueError(f"{path} is truncated")
+
+            strokes = []
+            view = memoryview(data)
+            try:
+                for color, start, count in table.tolist():
+                    stroke = Stroke(color)
+                    stroke.xs = _from_little_endian("i", view[xs_offset + 4 * start:xs_offset + 4 * (start + count)])
+                    stroke.ys = _from_little_endian("i", view[ys_offset + 4 * start:ys_offset + 4 * (start + count)])
+                    stroke.thicknesses = _from_little_endian(
+                        "f", view[thicknesses_offset + 4 * start:thicknesses_offset + 4 * (start + count)])
+                    stroke.samples = count
+                    strokes.append(stroke)
+            finally:
+                view.release()
+    return strokes
+
+
+def _stroke_record(stroke):
+    payload = b"".join((STROKE_HEADER.pack(stroke.color, len(stroke)), _little_endian(stroke.xs).tobytes(),
+                        _little_endian(stroke.ys).tobytes(), _little_endian(stroke.thicknesses).tobytes()))
+    return RECORD_HEADER.pack(RECORD_STROKE, len(payload)) + payload
+
+
+def _read_stroke(payload):
+    color, count = STROKE_HEADER.unpack_from(payload)
+    offset = STROKE_HEADER.size
+    if len(payload) != offset + 12 * count:
+        raise ValueError(f"stroke record of {len(payload)} bytes holds {count} points")
+    stroke = Stroke(color)
+    stroke.xs = _from_little_endian("i", payload[offset:offset + 4 * count])
+    stroke.ys = _from_little_endian("i", payload[offset + 4 * count:offset + 8 * count])
+    stroke.thicknesses = _from_little_endian("f", payload[offset + 8 * count:offset + 12 * count])
+    stroke.samples = count
+    return stroke
+
+
+def read_journal(path):
+    # Yield (record type, payload) for every complete record; a record cut short by a crash ends it
+    with open(path, "rb") as file:
+        data = file.read()
+    if data[:len(JOURNAL_MAGIC)] != JOURNAL_MAGIC:
+        raise ValueError(f"{path} is not a journal file")
+    offset = len(JOURNAL_MAGIC)
+    while offset + RECORD_HEADER.size <= len(data):
+        record_type, length = RECORD_HEADER.unpack_from(data, offset)
+        offset += RECORD_HEADER.size
+        if offset + length > len(data):
+            break
+        yield record_type, data[offset:offset + length]
+        offset += length
+
+
+def load_journal(path, ignore_clears=False):
+    # Replay a journal into the StrokeStore it describes. With ignore_clears the strokes removed by
+    # clearing the canvas (e.g. an accidental fist) are kept.
+    try:
+        return _replay_journal(path, ignore_clears)
+    except struct.error as error:  # A record too short for its type
+        raise ValueError(f"{path} is damaged: {error}") from None
+
+
+def _replay_journal(path, ignore_clears):
+    store = StrokeStore()
+    index = SegmentGrid()
+    for record_type, payload in read_journal(path):
+        if record_type == RECORD_STROKE:
+            stroke = _read_stroke(payload)
+            index.add_stroke(store.append(stroke), stroke)
+        elif record_type == RECORD_UNDO:
+            if store:
+                for stroke_id, _ in store.pop():
+                    index.remove_stroke(stroke_id)
+        elif record_type == RECORD_ERASE:
+            record = ERASE_RECORD if len(payload) == ERASE_RECORD.size else LEGACY_ERASE_RECORD
+            erase(store, index, *record.unpack(payload))
+        elif record_type == RECORD_REMOVE:
+            # Replaying from an empty store hands out the same ids as the session did
+            stroke_id, = REMOVE_RECORD.unpack(payload)
+            if stroke_id in store:
+                store.remove(stroke_id)
+                index.remove_stroke(stroke_id)
+        elif record_type == RECORD_CLEAR and not ignore_clears:
+            store.clear()
+            index.clear()
+    return store
+
+
+def load_strokes(path, ignore_clears=False):
+    # Strokes of a drawing file or a journal, depending on the file contents
+    with open(path, "rb") as file:
+        magic = file.read(len(JOURNAL_MAGIC))
+    if magic == JOURNAL_MAGIC:
+        return list(load_journal(path, ignore_clears))
+    return load_drawing(path)
+
+
+def write_journal(path, strokes):
+    # Start a journal holding just the given strokes, replacing the old one atomically. Used to
+    # compact a journal when a session is resumed.
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(JOURNAL_MAGIC)
+        for stroke in strokes:
+            file.write(_stroke_record(stroke))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+
+
+class JournalWriter(threading.Thread):
+    # Appends drawing events to the autosave journal from a background thread. The canvas only
+    # queues the event; encoding, writing and syncing never run on the GUI thread. Finished strokes
+    # are not modified afterwards, so they are queued without copying.
+    def __init__(self, path, sync_interval=1.0):
+        super().__init__(name="JournalWriter", daemon=True)
+        self.path = path
+        self.sync_interval = sync_interval  # Seconds between fsyncs while events keep coming
+        self.events = queue.Queue()
+        self.records_written = 0
+        self.start()
+
+    def stroke(self, stroke):
+        self.events.put(stroke)
+
+    def undo(self):
+        self.events.put(RECORD_HEADER.pack(RECORD_UNDO, 0))
+
+    def erase(self, x, y, radius):
+        self.events.put(RECORD_HEADER.pack(RECORD_ERASE, ERASE_RECORD.size) + ERASE_RECORD.pack(x, y, radius))
+
+    def remove(self, stroke_id):
+        # A stroke removed by id, e.g. undone by one user of the shared wall
+        self.events.put(RECORD_HEADER.pack(RECORD_REMOVE, REMOVE_RECORD.size) + REMOVE_RECORD.pack(stroke_id))
+
+    def clear(self):
+        self.events.put(RECORD_HEADER.pack(RECORD_CLEAR, 0))
+
+    def close(self):
+        # Write the pending events and stop the thread
+        self.events.put(None)
+        self.join()
+
+    def run(self):
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        try:
+            file = open(self.path, "ab")
+        except OSError as error:
+            print(f"Error: Cannot open autosave journal {self.path}: {error}")
+            return
+        with file:
+            if new_file:
+                file.write(JOURNAL_MAGIC)
+            last_sync = time.monotonic()
+            running = True
+            while running:
+                event = self.events.get()
+                # Write everything queued so far in one batch before flushing
+                while True:
+                    if event is None:
+                        running = False
+                    else:
+                        file.write(_stroke_record(event) if isinstance(event, Stroke) else event)
+                        self.records_written += 1
+                    if self.events.empty():
+                        break
+                    event = self.events.get()
+                file.flush()
+                if not running or time.monotonic() - last_sync >= self.sync_interval:
+                    os.fsync(file.fileno())
+                    last_sync = time.monotonic()
+
+
+def export_svg(path, strokes, width, height, background="#d2d2d2", left=0, top=0):
+    # Write the strokes as SVG, one stroke at a time. Consecutive segments with the same width are
+    # merged into one polyline, matching how the canvas draws them. (left, top) is the world point
+    # at the top left corner of the image.
+    with open(path, "w", encoding="utf-8") as file:
+        file.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                   f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+                   f'viewBox="{left} {top} {width} {height}">\n'
+                   f'<rect x="{left}" y="{top}" width="{width}" height="{height}" fill="{escape(background)}"/>\n'
+                   '<g fill="none" stroke-linecap="square">\n')
+        for stroke in strokes:
+            color = f"#{stroke.color & 0xFFFFFF:06x}"
+            xs, ys, thicknesses = stroke.xs, stroke.ys, stroke.thicknesses
+            i = 1
+            while i < len(xs):
+                width_px = int(thicknesses[i])
+                points = [f"{xs[i - 1]},{ys[i - 1]}", f"{xs[i]},{ys[i]}"]
+                i += 1
+                while i < len(xs) and int(thicknesses[i]) == width_px:
+                    points.append(f"{xs[i]},{ys[i]}")
+                    i += 1
+                file.write(f'<polyline stroke="{color}" stroke-width="{max(width_px, 1)}" points="{" ".join(points)}"/>\n')
+        file.write("</g>\n</svg>\n")
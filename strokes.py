@@ -0,0 +1,224 @@
+from array import array
+
+import numpy as np
+
+
+class Stroke:
+    # A single trail stored as contiguous coordinate and thickness arrays with one color per stroke,
+    # instead of one Python object per sample
+    __slots__ = ("xs", "ys", "thicknesses", "color", "samples")
+
+    def __init__(self, color):
+        self.xs = array("i")
+        self.ys = array("i")
+        self.thicknesses = array("f")
+        self.color = color  # Packed 0xAARRGGBB value, as returned by QColor.rgba()
+        self.samples = 0  # Raw samples offered to this stroke, before deduplication and simplification
+
+    def append(self, x, y, thickness):
+        # array.append is amortized O(1), like list.append
+        self.xs.append(x)
+        self.ys.append(y)
+        self.thicknesses.append(thickness)
+
+    def subset(self, mask):
+        # New stroke with only the points where mask is True
+        stroke = Stroke(self.color)
+        stroke.xs = array("i", np.frombuffer(self.xs, dtype=np.int32)[mask].tobytes())
+        stroke.ys = array("i", np.frombuffer(self.ys, dtype=np.int32)[mask].tobytes())
+        stroke.thicknesses = array("f", np.frombuffer(self.thicknesses, dtype=np.float32)[mask].tobytes())
+        stroke.samples = self.samples
+        return stroke
+
+    def bounds(self):
+        # (x0, y0, x1, y1) covering every point and the square pen caps around it
+        margin = int(max(self.thicknesses)) + 1
+        return min(self.xs) - margin, min(self.ys) - margin, max(self.xs) + margin, max(self.ys) + margin
+
+    def point(self, index):
+        return self.xs[index], self.ys[index], self.thicknesses[index]
+
+    def __len__(self):
+        return len(self.xs)
+
+    def nbytes(self):
+        # Memory used by the point data itself
+        return (len(self.xs) * self.xs.itemsize + len(self.ys) * self.ys.itemsize
+                + len(self.thicknesses) * self.thicknesses.itemsize)
+
+
+class StrokeStore:
+    # Finished strokes keyed by a stable id. Each stroke belongs to the drawn stroke it came from:
+    # itself, or the stroke the eraser cut it out of. Strokes are drawn, and undone, by drawn
+    # stroke, so the pieces left by the eraser keep the place of their stroke and an undo removes
+    # all that is left of the newest drawn stroke. Any stroke can also be removed by id.
+    __slots__ = ("strokes", "origins", "groups", "next_id")
+
+    def __init__(self):
+        self.strokes = {}
+        self.origins = {}  # stroke id -> id of the drawn stroke it belongs to
+        self.groups = {}  # drawn stroke id -> ids of its strokes still present, oldest drawn first
+        self.next_id = 0
+
+    def append(self, stroke):
+        # Add a newly drawn stroke, returning its id
+        stroke_id = self.next_id
+        self.next_id += 1
+        self.strokes[stroke_id] = stroke
+        self.origins[stroke_id] = stroke_id
+        self.groups[stroke_id] = [stroke_id]
+        return stroke_id
+
+    def replace(self, stroke_id, pieces):
+        # Replace a stroke with the pieces left of it, which take its place in the drawing order.
+        # Returns the (id, stroke) pairs of the pieces.
+        origin = self.origins.pop(stroke_id)
+        del self.strokes[stroke_id]
+        group = self.groups[origin]
+        position = group.index(stroke_id)
+        added = []
+        for piece in pieces:
+            piece_id = self.next_id
+            self.next_id += 1
+            self.strokes[piece_id] = piece
+            self.origins[piece_id] = origin
+            added.append((piece_id, piece))
+        group[position:position + 1] = [piece_id for piece_id, _ in added]
+        if not group:
+            del self.groups[origin]
+        return added
+
+    def pop(self, origin=None):
+        # Remove what is left of a drawn stroke, by default the newest, returning its (id, stroke) pairs
+        if origin is None:
+            _, group = self.groups.popitem()
+        else:
+            group = self.groups.pop(origin)
+        removed = []
+        for stroke_id in group:
+            del self.origins[stroke_id]
+            removed.append((stroke_id, self.strokes.pop(stroke_id)))
+        return removed
+
+    def remove(self, stroke_id):
+        origin = self.origins.pop(stroke_id)
+        group = self.groups[origin]
+        group.remove(stroke_id)
+        if not group:
+            del self.groups[origin]
+        return self.strokes.pop(stroke_id)
+
+    def get(self, stroke_id):
+        return self.strokes[stroke_id]
+
+    def origin(self, stroke_id):
+        # Id of the drawn stroke stroke_id belongs to
+        return self.origins[stroke_id]
+
+    def drawn(self):
+        # Ids of the drawn strokes that still have something left, oldest first
+        return self.groups.keys()
+
+    def drawing_order(self, stroke_ids):
+        # stroke_ids sorted in the order the strokes are painted: by drawn stroke, then piece
+        return sorted(stroke_ids, key=lambda stroke_id: (self.origins[stroke_id], stroke_id))
+
+    def items(self):
+        # (id, stroke) pairs in drawing order
+        return [(stroke_id, self.strokes[stroke_id]) for stroke_id in self.drawing_order(self.strokes)]
+
+    def clear(self):
+        self.strokes = {}
+        self.origins = {}
+        self.groups = {}
+
+    def point_count(self):
+        return sum(len(stroke) for stroke in self.strokes.values())
+
+    def __len__(self):
+        return len(self.strokes)
+
+    def __contains__(self, stroke_id):
+        return stroke_id in self.strokes
+
+    def __iter__(self):
+        # Strokes in drawing order
+        return (stroke for _, stroke in self.items())
+
+
+def simplify_mask(points, tolerance):
+    # Ramer-Douglas-Peucker on an (n, d) array: mask of the points to keep so that no dropped point
+    # is further than tolerance from the polyline through the kept ones. Endpoints are always kept.
+    count = len(points)
+    keep = np.zeros(count, dtype=bool)
+    if count == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    stack = [(0, count - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        a = points[start]
+        ab = points[end] - a
+        inner = points[start + 1:end] - a
+        length_squared = ab @ ab
+        if length_squared > 0:
+            # Distance to the segment, not the infinite line, so back-tracking strokes keep their turns
+            t = np.clip(inner @ ab / length_squared, 0, 1)
+            inner = inner - t[:, None] * ab
+        distances = np.sqrt((inner * inner).sum(axis=1))
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return keep
+
+
+class StrokeSimplifier:
+    # Shrinks strokes as they are drawn: samples closer than min_distance to the previous point are
+    # dropped at ingest, and finished strokes are simplified with Ramer-Douglas-Peucker in
+    # (x, y, thickness * thickness_weight) space so thickness variation is preserved too.
+    # Setting min_distance or tolerance to 0 disables that step.
+    def __init__(self, min_distance=1.5, tolerance=0.75, thickness_weight=1.0):
+        self.min_distance = min_distance  # Pixels
+        self.tolerance = tolerance  # Pixels
+        self.thickness_weight = thickness_weight
+        self.samples_received = 0  # Raw samples of the finished strokes
+        self.points_kept = 0  # Points stored for the finished strokes
+
+    def accept(self, stroke, x, y):
+        # Whether a new sample should be appended to stroke
+        stroke.samples += 1
+        if not len(stroke) or self.min_distance <= 0:
+            return True
+        dx = x - stroke.xs[-1]
+        dy = y - stroke.ys[-1]
+        return dx * dx + dy * dy >= self.min_distance * self.min_distance
+
+    def finish(self, stroke):
+        # Simplified copy of a finished stroke (or the stroke itself if nothing can be dropped)
+        if self.tolerance > 0 and len(stroke) > 2:
+            points = np.column_stack((
+                np.frombuffer(stroke.xs, dtype=np.int32),
+                np.frombuffer(stroke.ys, dtype=np.int32),
+                np.frombuffer(stroke.thicknesses, dtype=np.float32) * self.thickness_weight,
+            )).astype(np.float64)
+            keep = simplify_mask(points, self.tolerance)
+            if not keep.all():
+                stroke = stroke.subset(keep)
+        self.samples_received += max(stroke.samples, len(stroke))
+        self.points_kept += len(stroke)
+        return stroke
+
+    def reduction_ratio(self):
+        # Fraction of the raw samples that were not stored
+        if not self.samples_received:
+            return 0.0
+        return 1 - self.points_kept / self.samples_received
+
+    def report(self):
+        return (f"Stroke points: kept {self.points_kept} of {self.samples_received} samples "
+                f"({self.reduction_ratio():.0%} reduction)")
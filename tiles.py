@@ -0,0 +1,91 @@
+from collections import OrderedDict
+
+import numpy as np
+
+TILE_SIZE = 256  # Tile side in screen pixels
+ZOOM_STEPS = 4  # Zoom levels per doubling of the scale
+MIN_ZOOM_LEVEL = -16  # 1/16x
+MAX_ZOOM_LEVEL = 4  # 2x; strokes keep integer world coordinates, so zooming further in shows their steps
+LOD_PIXELS = 2.0  # Below 1x, points closer than this on screen are merged when a tile is rendered
+
+
+def zoom_for(level):
+    return 2.0 ** (level / ZOOM_STEPS)
+
+
+def tile_world_rect(key, tile_size=TILE_SIZE):
+    # (x0, y0, x1, y1) world area covered by the tile (level, column, row)
+    level, column, row = key
+    zoom = zoom_for(level)
+    return (column * tile_size / zoom, row * tile_size / zoom,
+            (column + 1) * tile_size / zoom, (row + 1) * tile_size / zoom)
+
+
+def visible_tiles(view_x, view_y, width, height, tile_size=TILE_SIZE):
+    # (column, row) of the tiles covering a width x height view whose top left corner is at
+    # (view_x, view_y) in the pixels of its zoom level
+    columns = range(view_x // tile_size, (view_x + width - 1) // tile_size + 1)
+    rows = range(view_y // tile_size, (view_y + height - 1) // tile_size + 1)
+    return [(column, row) for row in rows for column in columns]
+
+
+def lod_indices(xs, ys, cell):
+    # Indices of the points to draw when points closer than about cell world units would land on the
+    # same screen pixels: consecutive points in the same cell are merged, the end points are kept
+    xs = np.frombuffer(xs, dtype=np.int32)
+    ys = np.frombuffer(ys, dtype=np.int32)
+    columns = np.floor(xs / cell)
+    rows = np.floor(ys / cell)
+    keep = np.empty(len(xs), dtype=bool)
+    keep[0] = True
+    keep[1:] = (columns[1:] != columns[:-1]) | (rows[1:] != rows[:-1])
+    keep[-1] = True
+    return np.flatnonzero(keep)
+
+
+class TileCache:
+    # Rendered tiles keyed by (zoom level, column, row), least recently used first. Tiles are
+    # evicted once the cache exceeds max_bytes, so memory follows what has been looked at lately
+    # rather than the size of the drawing.
+    def __init__(self, max_bytes=64 * 1024 * 1024, tile_size=TILE_SIZE):
+        self.tile_size = tile_size
+        self.tile_bytes = tile_size * tile_size * 4  # 32-bit pixels
+        self.max_tiles = max(1, max_bytes // self.tile_bytes)
+        self.tiles = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        tile = self.tiles.get(key)
+        if tile is None:
+            self.misses += 1
+            return None
+        self.tiles.move_to_end(key)
+        self.hits += 1
+        return tile
+
+    def put(self, key, tile):
+        self.tiles[key] = tile
+        self.tiles.move_to_end(key)
+        while len(self.tiles) > self.max_tiles:
+            self.tiles.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, x0, y0, x1, y1):
+        # Drop the tiles of every zoom level that overlap the world rectangle
+        for key in [key for key in self.tiles if self._overlaps(key, x0, y0, x1, y1)]:
+            del self.tiles[key]
+
+    def _overlaps(self, key, x0, y0, x1, y1):
+        tile_x0, tile_y0, tile_x1, tile_y1 = tile_world_rect(key, self.tile_size)
+        return tile_x0 <= x1 and x0 <= tile_x1 and tile_y0 <= y1 and y0 <= tile_y1
+
+    def clear(self):
+        self.tiles.clear()
+
+    def nbytes(self):
+        return len(self.tiles) * self.tile_bytes
+
+    def __len__(self):
+        return len(self.tiles)
@@ -0,0 +1,108 @@
+import math
+
+import cv2
+import numpy as np
+
+
+class LandmarkTracker:
+    # Carries hand landmarks forward between MediaPipe detections with pyramidal Lucas-Kanade
+    # optical flow on a downscaled grayscale frame. Costs well under a millisecond for 21 points.
+    def __init__(self, scale=0.5, min_tracked_fraction=0.6, max_error=30.0):
+        self.scale = scale  # Resolution of the grayscale image used for tracking
+        self.min_tracked_fraction = min_tracked_fraction  # Below this the hand counts as lost
+        self.max_error = max_error
+        self.lk_params = dict(winSize=(15, 15), maxLevel=2,
+                              criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+        self.previous_gray = None
+        self.hands = None  # (hands, 21, 3) normalized landmarks of the previous frame
+
+    @property
+    def active(self):
+        return self.hands is not None and len(self.hands) > 0
+
+    def prepare(self, frame):
+        # Grayscale, downscaled copy of a BGR frame for tracking
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self.scale != 1:
+            gray = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return gray
+
+    def reset(self, gray, hands):
+        # Start tracking from freshly detected landmarks
+        self.previous_gray = gray
+        self.hands = hands if len(hands) else None
+
+    def track(self, gray):
+        # Move the landmarks of the previous frame onto this one; returns None when a hand is lost
+        if not self.active:
+            return None
+        height, width = gray.shape[:2]
+        size = np.array([width, height], dtype=np.float32)
+        previous_points = (self.hands[:, :, :2].reshape(-1, 2) * size).astype(np.float32)
+        points, status, error = cv2.calcOpticalFlowPyrLK(self.previous_gray, gray, previous_points.reshape(-1, 1, 2),
+                                                         None, **self.lk_params)
+        points = points.reshape(-1, 2)
+        tracked = (status.ravel() == 1) & (error.ravel() < self.max_error)
+
+        hands = self.hands.copy()
+        for h in range(len(hands)):
+            hand_tracked = tracked[h * 21:(h + 1) * 21]
+            if hand_tracked.mean() < self.min_tracked_fraction:
+                self.hands = None
+                return None
+            hand_points = points[h * 21:(h + 1) * 21]
+            hand_previous = previous_points[h * 21:(h + 1) * 21]
+            # Points that were not tracked follow the median motion of the rest of the hand
+            motion = np.median(hand_points[hand_tracked] - hand_previous[hand_tracked], axis=0)
+            hand_points = np.where(hand_tracked[:, None], hand_points, hand_previous + motion)
+            hands[h, :, :2] = hand_points / size
+
+        self.previous_gray = gray
+        self.hands = hands
+        return hands
+
+
+class InferenceScheduler:
+    # Decides on which frames to run the full hand model. With detection taking D seconds and
+    # tracking T seconds, running the model every N frames costs (D + (N - 1) * T) / N per frame,
+    # so N is the smallest interval that keeps that within the target frame time.
+    def __init__(self, target_fps=30.0, max_interval=8, min_confidence=0.8, smoothing=0.1):
+        self.target_fps = target_fps
+        self.max_interval = max_interval
+        self.min_confidence = min_confidence  # Handedness score below which the next frame is re-detected
+        self.smoothing = smoothing  # Weight of new samples in the moving averages
+        self.interval = 1  # Current N
+        self.frames_since_detection = 0
+        self.detection_time = None
+        self.tracking_time = None
+
+    def should_detect(self, tracking_active):
+        return not tracking_active or self.frames_since_detection >= self.interval
+
+    def detected(self, seconds, scores):
+        self.detection_time = self._average(self.detection_time, seconds)
+        # Low confidence: do not trust the landmarks for tracking, detect again on the next frame
+        low_confidence = any(score < self.min_confidence for score in scores)
+        self.frames_since_detection = self.interval if low_confidence else 1
+        self._update_interval()
+
+    def tracked(self, seconds):
+        self.tracking_time = self._average(self.tracking_time, seconds)
+        self.frames_since_detection += 1
+        self._update_interval()
+
+    def _average(self, average, sample):
+        return sample if average is None else average + self.smoothing * (sample - average)
+
+    def _update_interval(self):
+        if self.detection_time is None:
+            return
+        budget = 1.0 / self.target_fps
+        tracking_time = self.tracking_time or 0.0
+        if self.detection_time <= budget:
+            self.interval = 1
+        elif tracking_time >= budget:
+            self.interval = self.max_interval
+        else:
+            interval = math.ceil((self.detection_time - tracking_time) / (budget - tracking_time))
+            self.interval = max(1, min(self.max_interval, interval))
@@ -0,0 +1,42 @@
+import threading
+import time
+
+
+class HandModelLoader(threading.Thread):
+    # Imports OpenCV, MediaPipe and the modules built on them and constructs the Hands model in the
+    # background, so the window can show before any of it is ready. Started right away; wait()
+    # returns the model (None if it could not be built, see error).
+    def __init__(self, model_complexity=1, max_num_hands=2):
+        super().__init__(name="HandModelLoader", daemon=True)
+        self.model_complexity = model_complexity
+        self.max_num_hands = max_num_hands
+        self.hands = None
+        self.error = None
+        self.load_time = None  # Seconds spent importing and building the model
+        self.ready = threading.Event()
+        self.start()
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            # Importing them here also warms up the modules the capture pipeline is built from
+            import cv2
+            import mediapipe as mp
+            import numpy as np
+
+            import cameras, pipeline, roi, tracking
+            hands = mp.solutions.hands.Hands(model_complexity=self.model_complexity, max_num_hands=self.max_num_hands)
+            # The first inference initializes the graph and its delegates; pay for it here rather
+            # than on the first camera frame
+            hands.process(np.zeros((64, 64, 3), dtype=np.uint8))
+            self.hands = hands
+        except Exception as error:  # Missing or broken install: reported when a camera is started
+            self.error = error
+        self.load_time = time.perf_counter() - start
+        if self.hands is not None:
+            print(f"Hand model ready after {self.load_time * 1000:.0f} ms in the background")
+        self.ready.set()
+
+    def wait(self, timeout=None):
+        self.ready.wait(timeout)
+        return self.hands